@@ -0,0 +1,183 @@
+import sys
+
+FALSE, TRUE = 0, 1
+
+
+class BDD(object):
+
+
+    def __init__(self, order=()):
+        self.order = []
+        self.levels = {}
+        self.level = [sys.maxsize, sys.maxsize]
+        self.low = [None, None]
+        self.high = [None, None]
+        self.unique = {}
+        self.cache = {}
+        for name in order:
+            self.add_var(name)
+
+
+    def add_var(self, name):
+        if name not in self.levels:
+            self.levels[name] = len(self.order)
+            self.order.append(name)
+        return self.levels[name]
+
+
+    def var(self, name):
+        return self.mk(self.add_var(name), FALSE, TRUE)
+
+
+    def mk(self, level, low, high):
+        if low == high:
+            return low
+        key = (level, low, high)
+        node = self.unique.get(key)
+        if node is None:
+            node = len(self.level)
+            self.level.append(level)
+            self.low.append(low)
+            self.high.append(high)
+            self.unique[key] = node
+        return node
+
+
+    def cofactors(self, node, level):
+        if self.level[node] == level:
+            return self.low[node], self.high[node]
+        return node, node
+
+
+    def shortcut(self, f, g, h):
+        if f == TRUE:
+            return g
+        elif f == FALSE:
+            return h
+        elif g == h:
+            return g
+        elif g == TRUE and h == FALSE:
+            return f
+        return self.cache.get((f, g, h))
+
+
+    def ite(self, f, g, h):
+        # an explicit stack rather than recursion, which would need a
+        # frame for every variable level
+        stack = [(f, g, h)]
+        while stack:
+            key = stack[-1]
+            if self.shortcut(*key) is not None:
+                stack.pop()
+                continue
+
+            top = min(self.level[node] for node in key)
+            (f0, f1), (g0, g1), (h0, h1) = [ self.cofactors(node, top) for node in key ]
+            low, high = self.shortcut(f0, g0, h0), self.shortcut(f1, g1, h1)
+            if low is not None and high is not None:
+                self.cache[key] = self.mk(top, low, high)
+                stack.pop()
+            else:
+                if high is None:
+                    stack.append((f1, g1, h1))
+                if low is None:
+                    stack.append((f0, g0, h0))
+        return self.shortcut(f, g, h)
+
+
+    def negate(self, u):
+        return self.ite(u, FALSE, TRUE)
+
+
+    def conjoin(self, u, v):
+        return self.ite(u, v, FALSE)
+
+
+    def disjoin(self, u, v):
+        return self.ite(u, TRUE, v)
+
+
+    def implies(self, u, v):
+        return self.ite(u, v, TRUE)
+
+
+    def equals(self, u, v):
+        return self.ite(u, v, self.negate(v))
+
+
+    def restrict(self, u, name, value):
+        level = self.levels[name]
+        memo, stack = {}, [u]
+        while stack:
+            node = stack[-1]
+            if node in memo:
+                stack.pop()
+            elif self.level[node] > level:
+                memo[node] = node
+            elif self.level[node] == level:
+                memo[node] = self.high[node] if value else self.low[node]
+            else:
+                low, high = self.low[node], self.high[node]
+                if low in memo and high in memo:
+                    memo[node] = self.mk(self.level[node], memo[low], memo[high])
+                else:
+                    stack += [ child for child in (low, high) if child not in memo ]
+        return memo[u]
+
+
+    def size(self, u):
+        seen, stack = set(), [u]
+        while stack:
+            node = stack.pop()
+            if node > TRUE and node not in seen:
+                seen.add(node)
+                stack += [self.low[node], self.high[node]]
+        return len(seen)
+
+
+    def count(self, u, names=None):
+        n = len(self.order)
+        memo, stack = {FALSE: 0, TRUE: 1}, [u]
+
+        def level(node):
+            return n if node <= TRUE else self.level[node]
+
+        while stack:
+            node = stack[-1]
+            low, high = self.low[node], self.high[node]
+            if node in memo:
+                stack.pop()
+            elif low in memo and high in memo:
+                memo[node] = (
+                    (memo[low] << (level(low) - level(node) - 1)) +
+                    (memo[high] << (level(high) - level(node) - 1)))
+            else:
+                stack += [ child for child in (low, high) if child not in memo ]
+
+        total = memo[u] << level(u)
+        if names is not None:
+            total >>= n - len(names)
+        return total
+
+
+    def models(self, u, names):
+        names = sorted(names, key=self.levels.get)
+        stack = [(u, 0, None)]
+        while stack:
+            node, i, assigned = stack.pop()
+            if node == FALSE:
+                continue
+            if i == len(names):
+                model = {}
+                while assigned is not None:
+                    name, value, assigned = assigned
+                    model[name] = value
+                yield model
+                continue
+
+            name = names[i]
+            for value in (False, True):
+                child = node
+                if self.level[node] == self.levels[name]:
+                    child = self.high[node] if value else self.low[node]
+                stack.append((child, i + 1, (name, value, assigned)))
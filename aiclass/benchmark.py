@@ -0,0 +1,210 @@
+from __future__ import print_function
+
+from aiclass.command import BaseCommand
+from aiclass.graph import CompactGraph, HeuristicTable
+from aiclass.search import MapRoutingProblem, BfsSearcher, DfsSearcher, CfsSearcher, AstarSearcher
+import json, math, platform, random, sys, timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+SEARCHERS = [
+    ('bfs', BfsSearcher),
+    ('dfs', DfsSearcher),
+    ('cfs', CfsSearcher),
+    ('astar', AstarSearcher) ]
+
+
+def grid_graph(n, m, rng):
+    edges, h = [], {}
+    for y in range(n):
+        for x in range(m):
+            name = '%d,%d' % (y, x)
+            h[name] = (n - 1 - y) + (m - 1 - x)
+            if y + 1 < n:
+                edges.append((name, '%d,%d' % (y + 1, x), 1))
+            if x + 1 < m:
+                edges.append((name, '%d,%d' % (y, x + 1), 1))
+    return edges, h, '0,0', '%d,%d' % (n - 1, m - 1)
+
+
+def geometric_graph(n, rng, scale=1000):
+    points = [ (rng.random() * scale, rng.random() * scale) for i in range(n) ]
+    radius = scale * math.sqrt(2.0 * math.log(max(n, 2)) / (math.pi * n))
+    cells = {}
+    for i, (x, y) in enumerate(points):
+        cells.setdefault((int(x // radius), int(y // radius)), []).append(i)
+
+    edges = []
+    for i, (x, y) in enumerate(points):
+        cx, cy = int(x // radius), int(y // radius)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in cells.get((cx + dx, cy + dy), ()):
+                    d = math.hypot(x - points[j][0], y - points[j][1])
+                    if i < j and d <= radius:
+                        edges.append(('n%d' % i, 'n%d' % j, int(math.ceil(d))))
+
+    neighbours = {}
+    for a, b, c in edges:
+        neighbours.setdefault(int(a[1:]), []).append(int(b[1:]))
+        neighbours.setdefault(int(b[1:]), []).append(int(a[1:]))
+    initial = min(neighbours or [0], key=lambda i: points[i][0] + points[i][1])
+    component, stack = set([initial]), [initial]
+    while stack:
+        for j in neighbours.get(stack.pop(), ()):
+            if j not in component:
+                component.add(j)
+                stack.append(j)
+    goal = max(component, key=lambda i: points[i][0] + points[i][1])
+    gx, gy = points[goal]
+    h = dict(('n%d' % i, int(math.hypot(x - gx, y - gy))) for i, (x, y) in enumerate(points))
+    return edges, h, 'n%d' % initial, 'n%d' % goal
+
+
+def scale_free_graph(n, rng, m=2, max_cost=10):
+    edges, ends = [], []
+    for i in range(1, min(m + 1, n)):
+        edges.append(('n0', 'n%d' % i, rng.randint(1, max_cost)))
+        ends += [0, i]
+    for i in range(m + 1, n):
+        targets = set()
+        while len(targets) < m:
+            targets.add(rng.choice(ends))
+        for j in targets:
+            edges.append(('n%d' % i, 'n%d' % j, rng.randint(1, max_cost)))
+            ends += [i, j]
+    h = dict(('n%d' % i, 0) for i in range(n))
+    return edges, h, 'n0', 'n%d' % (n - 1)
+
+
+GRAPHS = {
+    'grid': lambda size, rng: grid_graph(int(math.sqrt(size)), int(math.sqrt(size)), rng),
+    'geometric': geometric_graph,
+    'scale-free': scale_free_graph }
+
+
+def create_problem(kind, size, seed):
+    edges, h, initial, goal = GRAPHS[kind](size, random.Random(seed))
+    graph = CompactGraph.from_edges(edges, directed=False)
+    return MapRoutingProblem(
+        paths = graph,
+        heuristics = HeuristicTable.from_dict(graph, h),
+        initial = initial,
+        goal = goal)
+
+
+def measure(problem, searcher_class, timer=timeit.default_timer):
+    start = timer()
+    searcher = searcher_class(problem)
+    goal = searcher.search()
+    seconds = timer() - start
+
+    # tracing slows every allocation, so memory is taken from a second
+    # run rather than the timed one
+    peak = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        searcher_class(problem).search()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'seconds': seconds,
+        'expanded': searcher.expand_count,
+        'frontier_peak': searcher.frontier_peak,
+        'peak_memory': peak,
+        'cost': None if goal is None else searcher.path_cost(goal) }
+
+
+def run(graphs, sizes, searchers, seed=0, repeat=1, out=None):
+    results = []
+    for kind in graphs:
+        for size in sizes:
+            problem = create_problem(kind, size, seed)
+            for name, searcher_class in searchers:
+                runs = [ measure(problem, searcher_class) for i in range(repeat) ]
+                result = min(runs, key=lambda r: r['seconds'])
+                result.update(graph=kind, size=size, nodes=len(problem.graph), searcher=name)
+                results.append(result)
+                if out is not None:
+                    print(format_result(result), file=out)
+    return results
+
+
+def format_result(result, baseline=None):
+    line = '%-10s %8d %-6s %10.4fs %9d expanded' % (
+        result['graph'], result['size'], result['searcher'], result['seconds'], result['expanded'])
+    if result['peak_memory'] is not None:
+        line += ' %10d bytes' % result['peak_memory']
+    if baseline is not None:
+        line += '  x%.2f time' % (result['seconds'] / baseline['seconds'] if baseline['seconds'] else 0.0)
+    return line
+
+
+def key(result):
+    return result['graph'], result['size'], result['searcher']
+
+
+class BenchmarkCommand(BaseCommand):
+
+    name = 'benchmark'
+    description = 'time searchers on generated graphs'
+    help = 'benchmark searchers'
+
+
+    @classmethod
+    def configure_parser(cls, parser):
+        parser.add_argument('-g', '--graphs', default='grid,geometric,scale-free', help='comma separated graph kinds')
+        parser.add_argument('-n', '--sizes', default='100,1000,10000', help='comma separated node counts')
+        parser.add_argument('-s', '--searchers', default='bfs,dfs,cfs,astar', help='comma separated searcher types')
+        parser.add_argument('-r', '--repeat', default=1, type=int, help='runs per searcher, the fastest is kept')
+        parser.add_argument('--seed', default=0, type=int, help='seed of the graph generators')
+        parser.add_argument('-o', '--output', help='file to write the results to as JSON')
+        parser.add_argument('--compare', help='results file of an earlier run to compare with')
+
+
+    @classmethod
+    def create_from_args(cls, args):
+        searchers = dict(SEARCHERS)
+        return cls(
+            graphs = args.graphs.split(','),
+            sizes = [ int(s) for s in args.sizes.split(',') ],
+            searchers = [ (s, searchers[s]) for s in args.searchers.split(',') ],
+            seed = args.seed,
+            repeat = args.repeat,
+            output = args.output,
+            compare = args.compare)
+
+
+    def __init__(self, graphs, sizes, searchers, seed=0, repeat=1, output=None, compare=None):
+        self.graphs = graphs
+        self.sizes = sizes
+        self.searchers = searchers
+        self.seed = seed
+        self.repeat = repeat
+        self.output = output
+        self.compare = compare
+
+
+    def loop(self):
+        results = run(self.graphs, self.sizes, self.searchers, self.seed, self.repeat, sys.stdout)
+
+        if self.compare is not None:
+            with open(self.compare, 'r') as f:
+                baseline = dict((key(r), r) for r in json.load(f)['results'])
+            print()
+            for result in results:
+                if key(result) in baseline:
+                    print(format_result(result, baseline[key(result)]))
+
+        if self.output is not None:
+            with open(self.output, 'w') as f:
+                json.dump({
+                    'python': platform.python_version(),
+                    'seed': self.seed,
+                    'results': results }, f, indent=1, sort_keys=True)
+        raise SystemExit
@@ -0,0 +1,171 @@
+import os, pickle, struct, timeit, zlib
+
+LENGTH = struct.Struct('<I')
+SNAPSHOT = ['path_to', 'g', '_children', '_in_frontier', '_frontier']
+FINGERPRINT = ['searcher', 'problem', 'initial', 'goal', 'graph']
+FINGERPRINT_LIMIT = 10000
+
+
+class CheckpointError(ValueError):
+    pass
+
+
+class Journal(object):
+
+
+    def __init__(self, searcher, filename=None, every=None, seconds=None, timer=timeit.default_timer):
+        self.searcher = searcher
+        self.filename = filename
+        self.every = every
+        self.seconds = seconds
+        self.timer = timer
+        self.events = []
+        self.written = None
+        self.saved_count = searcher.expand_count
+        self.saved_time = timer()
+        self.attach()
+
+
+    def attach(self):
+        searcher, events = self.searcher, self.events
+
+        log_path = searcher.log_path
+        def journaled_log_path(from_state, action, to_state):
+            events.append(('l', from_state, action, to_state))
+            return log_path(from_state, action, to_state)
+        searcher.log_path = journaled_log_path
+
+        add_to_frontier = searcher.add_to_frontier
+        def journaled_add_to_frontier(state, depth):
+            events.append(('a', state, depth))
+            return add_to_frontier(state, depth)
+        searcher.add_to_frontier = journaled_add_to_frontier
+
+        get_next_from_frontier = searcher.get_next_from_frontier
+        def journaled_get_next_from_frontier():
+            events.append(('p',))
+            return get_next_from_frontier()
+        searcher.get_next_from_frontier = journaled_get_next_from_frontier
+
+        expand = searcher.expand
+        def checkpointed_expand():
+            state = expand()
+            if self.due():
+                self.save()
+            return state
+        searcher.expand = checkpointed_expand
+
+
+    def due(self):
+        if self.filename is None:
+            return False
+        if self.every is not None and self.searcher.expand_count - self.saved_count >= self.every:
+            return True
+        return self.seconds is not None and self.timer() - self.saved_time >= self.seconds
+
+
+    def save(self, filename=None):
+        filename = self.filename if filename is None else filename
+        searcher = self.searcher
+        record = {
+            'expand_count': searcher.expand_count,
+            'frontier_peak': searcher.frontier_peak,
+            'goal_reached': searcher.goal_reached,
+            'events': self.events }
+
+        # the events only continue a journal this one has written, any
+        # other file starts over from a snapshot of the whole search
+        mode = 'ab'
+        if filename != self.written:
+            record['snapshot'] = dict((name, getattr(searcher, name)) for name in SNAPSHOT)
+            record['fingerprint'] = fingerprint(searcher)
+            record['events'] = []
+            mode = 'wb'
+        record = zlib.compress(pickle.dumps(record, pickle.HIGHEST_PROTOCOL))
+
+        with open(filename, mode) as f:
+            f.write(LENGTH.pack(len(record)))
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+
+        del self.events[:]
+        self.filename = filename
+        self.written = filename
+        self.saved_count = searcher.expand_count
+        self.saved_time = self.timer()
+
+
+    @classmethod
+    def load(cls, searcher, filename, **options):
+        expected = fingerprint(searcher)
+        for record in read_records(filename):
+            if 'snapshot' in record:
+                check(filename, expected, record.get('fingerprint', {}))
+                restore(searcher, record['snapshot'])
+            replay(searcher, record['events'])
+            searcher.expand_count = record['expand_count']
+            searcher.frontier_peak = record['frontier_peak']
+            searcher.goal_reached = record['goal_reached']
+        journal = cls(searcher, filename, **options)
+        journal.written = filename
+        return journal
+
+
+
+def read_records(filename):
+    with open(filename, 'rb') as f:
+        while True:
+            header = f.read(LENGTH.size)
+            if len(header) < LENGTH.size:
+                return
+            data = f.read(LENGTH.unpack(header)[0])
+            try:
+                yield pickle.loads(zlib.decompress(data))
+            except zlib.error:
+                # a record cut short by a crash ends the journal
+                return
+
+
+def fingerprint(searcher):
+    from aiclass.routing import graph_digest
+    problem = searcher.problem
+    initial = problem.get_initial()
+    try:
+        goal = problem.get_name(problem.get_goal())
+    except NotImplementedError:
+        goal = None
+    return {
+        'searcher': type(searcher).__name__,
+        'problem': type(problem).__name__,
+        'initial': problem.get_name(initial),
+        'goal': goal,
+        # past the limit only the names above tell the problems apart
+        'graph': graph_digest(problem, [initial], FINGERPRINT_LIMIT) }
+
+
+def check(filename, expected, found):
+    for name in FINGERPRINT:
+        if found.get(name) != expected[name]:
+            if name == 'graph':
+                raise CheckpointError('%s is a checkpoint of another graph' % filename)
+            raise CheckpointError('%s is a checkpoint with %s %s, not %s' % (
+                filename, name, found.get(name), expected[name]))
+
+
+def restore(searcher, snapshot):
+    for name, value in snapshot.items():
+        setattr(searcher, name, value)
+    if hasattr(searcher, 'priority'):
+        searcher._frontier.priority = searcher.priority
+
+
+def replay(searcher, events):
+    for event in events:
+        if event[0] == 'l':
+            searcher.log_path(*event[1:])
+        elif event[0] == 'a':
+            searcher.add_to_frontier(*event[1:])
+        else:
+            state, depth = searcher.get_next_from_frontier()
+            searcher._in_frontier.discard(state)
@@ -1,6 +1,8 @@
 from __future__ import print_function
 
 import sys
+import os.path
+import mmap
 import argparse
 
 if (sys.version_info > (3,0)):
@@ -21,6 +23,13 @@ class BaseCommand(object):
 
         with open(location, 'r') as f:
             return f.read()
+
+
+    @classmethod
+    def open_data(cls, location, use_mmap=False, progress=False):
+        if location.startswith('data:'):
+            return cls.get_data(location)
+        return read_lines(location, use_mmap, sys.stderr if progress else None)
     
     @classmethod
     def configure_parser(cls, parser):
@@ -42,15 +51,38 @@ class BaseCommand(object):
                 traceback.print_exception(*sys.exc_info())
 
 
+def read_lines(location, use_mmap=False, progress=None, every=1<<20):
+    size = os.path.getsize(location)
+    done = reported = 0
+
+    with open(location, 'rb') as f:
+        if use_mmap and size:
+            f = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for line in iter(f.readline, b''):
+                yield line.decode('utf-8')
+                if progress is not None:
+                    done += len(line)
+                    if done - reported >= every or done == size:
+                        reported = done
+                        progress.write('\r%s: %d%%' % (location, 100 * done // size))
+                        if done == size:
+                            progress.write('\n')
+                        progress.flush()
+        finally:
+            f.close()
+
+
 def get_command_from_args(argv=None):
-    from aiclass import search, network, naive, plan, propositional
+    from aiclass import search, network, naive, plan, propositional, benchmark
 
     COMMANDS = [
         search.SearchCommand,
         network.NetworkCommand,
         naive.NaiveCommand,
         plan.PlanCommand,
-        propositional.ProposCommand ]
+        propositional.ProposCommand,
+        benchmark.BenchmarkCommand ]
 
     parser = argparse.ArgumentParser(prog='aiclass')
     subparsers = parser.add_subparsers(title='available commands', dest='command')
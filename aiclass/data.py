@@ -209,6 +209,14 @@ class ASTAR_SEARCH_PROBLEM(search.Problem):
 
     def heuristic(self, state):
         return self.h[state]
+
+
+    def get_goal(self):
+        return 'd6'
+
+
+    def reverse_actions(self, state):
+        return self.actions(state)
         
 
 
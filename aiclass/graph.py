@@ -0,0 +1,255 @@
+from array import array
+import hashlib, mmap, os, struct
+
+
+class CompactGraph(object):
+
+
+    def __init__(self, names, offsets=None, targets=None, weights=None, ids=None):
+        self.names = names
+        self.ids = dict((name, i) for i, name in enumerate(names)) if ids is None else ids
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+
+
+    @classmethod
+    def from_edges(cls, edges, directed=True):
+        names, ids = [], {}
+        sources, targets, weights = array('i'), array('i'), None
+
+        for edge in edges:
+            for name in edge[:2]:
+                if name not in ids:
+                    ids[name] = len(names)
+                    names.append(name)
+            sources.append(ids[edge[0]])
+            targets.append(ids[edge[1]])
+            if len(edge) > 2:
+                if weights is None:
+                    weights = array('l')
+                weights.append(edge[2])
+
+        graph = cls(names, ids=ids)
+        graph.build(sources, targets, weights, directed)
+        return graph
+
+
+    def build(self, sources, targets, weights=None, directed=True):
+        if directed:
+            passes = [(sources, targets)]
+        else:
+            passes = [(sources, targets), (targets, sources)]
+
+        offsets = array('l', [0]) * (len(self.names) + 1)
+        for s, t in passes:
+            for a in s:
+                offsets[a+1] += 1
+        for i in range(len(self.names)):
+            offsets[i+1] += offsets[i]
+
+        position = offsets[:-1]
+        out_targets = array('i', [0]) * offsets[-1]
+        out_weights = None if weights is None else array('l', [0]) * offsets[-1]
+        for s, t in passes:
+            for i in range(len(s)):
+                p = position[s[i]]
+                out_targets[p] = t[i]
+                if weights is not None:
+                    out_weights[p] = weights[i]
+                position[s[i]] = p + 1
+
+        self.offsets, self.targets, self.weights = offsets, out_targets, out_weights
+
+
+    def transpose(self):
+        sources = array('i')
+        for a in range(len(self)):
+            sources.extend([a] * (self.offsets[a+1] - self.offsets[a]))
+        graph = CompactGraph(self.names, ids=self.ids)
+        graph.build(self.targets, sources, self.weights)
+        return graph
+
+
+    def __len__(self):
+        return len(self.names)
+
+
+    def __getitem__(self, node):
+        lo, hi = self.offsets[node], self.offsets[node+1]
+        if self.weights is None:
+            return self.targets[lo:hi]
+        return list(zip(self.targets[lo:hi], self.weights[lo:hi]))
+
+
+    def get(self, node, default=None):
+        if node is not None and 0 <= node < len(self.names):
+            return self[node]
+        return default
+
+
+
+class NameTable(object):
+
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+    def __getitem__(self, i):
+        return self.raw(i).decode('utf-8')
+
+
+    def raw(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i+1]])
+
+
+
+class NameIndex(object):
+
+
+    def __init__(self, names, order):
+        self.names = names
+        self.order = order
+
+
+    def get(self, name, default=None):
+        key = name.encode('utf-8')
+        lo, hi = 0, len(self.order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.names.raw(self.order[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.order) and self.names.raw(self.order[lo]) == key:
+            return self.order[lo]
+        return default
+
+
+    def __getitem__(self, name):
+        i = self.get(name)
+        if i is None:
+            raise KeyError(name)
+        return i
+
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+
+
+class HeuristicTable(object):
+    MISSING = -(1 << 63)
+
+
+    def __init__(self, values):
+        self.values = values
+
+
+    @classmethod
+    def from_dict(cls, graph, h):
+        values = array('q', [cls.MISSING]) * len(graph)
+        for name, value in h.items():
+            if name in graph.ids:
+                values[graph.ids[name]] = value
+        return cls(values)
+
+
+    def __len__(self):
+        return len(self.values)
+
+
+    def __getitem__(self, state):
+        value = self.values[state]
+        if value == self.MISSING:
+            raise KeyError(state)
+        return value
+
+
+
+MAGIC = b'AICG'
+VERSION = 1
+HEADER = struct.Struct('<4sIqqqq')
+
+
+def file_digest(*filenames):
+    digest = hashlib.sha1(MAGIC + struct.pack('<I', VERSION))
+    for filename in filenames:
+        digest.update(b'\0')
+        if filename is not None:
+            with open(filename, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def view(buf, typecode, start, count):
+    if count == 0:
+        return array(typecode)
+    size = array(typecode).itemsize
+    try:
+        return memoryview(buf)[start:start + count * size].cast(typecode)
+    except AttributeError:
+        return array(typecode, buf[start:start + count * size])
+
+
+def save_graph(filename, graph, h=None):
+    names = [ name.encode('utf-8') for name in graph.names ]
+    name_offsets = array('q', [0])
+    for name in names:
+        name_offsets.append(name_offsets[-1] + len(name))
+    order = array('i', sorted(range(len(names)), key=names.__getitem__))
+
+    sections = [
+        array('q', graph.offsets),
+        array('i', graph.targets),
+        array('q', graph.weights) if graph.weights is not None else array('q'),
+        name_offsets,
+        order,
+        h.values if h is not None else array('q'),
+        b''.join(names) ]
+
+    flags = (graph.weights is not None) | (h is not None) << 1
+    tmp = '%s.%d.tmp' % (filename, os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(graph), len(graph.targets), flags, len(sections[-1])))
+        for section in sections:
+            data = section if isinstance(section, bytes) else section.tobytes()
+            f.write(data)
+            f.write(b'\0' * (-len(data) % 8))
+    os.rename(tmp, filename)
+
+
+def load_graph(filename):
+    with open(filename, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    magic, version, n, m, flags, blob = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('%s is not a graph cache' % filename)
+
+    position = [HEADER.size]
+    def section(typecode, count):
+        start = position[0]
+        position[0] += -(-count * array(typecode).itemsize // 8) * 8
+        return view(buf, typecode, start, count)
+
+    offsets = section('q', n + 1)
+    targets = section('i', m)
+    weights = section('q', m if flags & 1 else 0)
+    name_offsets = section('q', n + 1)
+    order = section('i', n)
+    values = section('q', n if flags & 2 else 0)
+    start = position[0]
+    blob = memoryview(buf)[start:start + blob]
+
+    names = NameTable(blob, name_offsets)
+    graph = CompactGraph(names, offsets, targets, weights if flags & 1 else None, NameIndex(names, order))
+    graph.buffer = buf
+    return graph, HeuristicTable(values) if flags & 2 else None
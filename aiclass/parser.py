@@ -1,13 +1,32 @@
 from ply import lex, yacc
+from aiclass.graph import CompactGraph
+import os
 
 
 
 class SimpleParser(object):
+    table_dir = os.environ.get('AICLASS_PARSER_TABLES')
+    built = {}
 
     def __init__(self):
+        cls = type(self)
+        if cls not in SimpleParser.built:
+            SimpleParser.built[cls] = self.build()
+        lexer, self.parser, self.tokens = SimpleParser.built[cls]
+        self.lexer = lexer.clone()
+
+
+    def build(self):
         self.tokens = [ a[2:] for a in dir(self) if a[:2] == 't_' and a[2:].isupper() ]
-        self.lexer = lex.lex(module=self, debug=False)
-        self.parser = yacc.yacc(module=self, debug=False, write_tables=False)
+        options = dict(module=self, debug=False, write_tables=False)
+        if self.table_dir:
+            if not os.path.isdir(self.table_dir):
+                os.makedirs(self.table_dir)
+            cls = type(self)
+            options['write_tables'] = True
+            options['picklefile'] = os.path.join(
+                self.table_dir, '%s.%s.pickle' % (cls.__module__, cls.__name__))
+        return lex.lex(module=self, debug=False), yacc.yacc(**options), self.tokens
 
 
     def t_error(self, t):
@@ -19,18 +38,27 @@ class SimpleParser(object):
 
 
     def parse(self, data):
-        return self.parser.parse(data)
+        return self.parser.parse(data, lexer=self.lexer)
+
+
 
+def iter_lines(data):
+    if hasattr(data, 'splitlines'):
+        return data.splitlines()
+    return data
 
 
-def parse_graph(data):
-    edges = []
 
-    for line in data.splitlines():
+def iter_graph(data):
+    for line in iter_lines(data):
         line = line.strip()
         if line:
             a, b = line.split('->', 1)
-            edges.append((a.strip(), b.strip()))
-    
-    return edges 
+            yield a.strip(), b.strip()
+
+
 
+def parse_graph(data, compact=False):
+    if compact:
+        return CompactGraph.from_edges(iter_graph(data))
+    return list(iter_graph(data))
@@ -1,72 +1,413 @@
+from __future__ import print_function
+
+from aiclass.bdd import BDD, FALSE, TRUE
 from aiclass.command import BaseCommand
 from aiclass.parser import SimpleParser
-import itertools, operator
+from aiclass.sat import CNF, Solver, model_count
+import itertools, operator, sys, weakref
+
+SAT_THRESHOLD = 20
+
+
+def imply(a, b):
+    return (not a) or b
+
+
+TEMPLATES = {
+    operator.__not__: '(not %s)',
+    operator.__and__: '(%s and %s)',
+    operator.__or__: '(%s or %s)',
+    imply: '((not %s) or %s)',
+    operator.__eq__: '(%s == %s)' }
+
+BIT_TEMPLATES = {
+    operator.__not__: '(_mask ^ %s)',
+    operator.__and__: '(%s & %s)',
+    operator.__or__: '(%s | %s)',
+    imply: '((_mask ^ %s) | %s)',
+    operator.__eq__: '(_mask ^ (%s ^ %s))' }
+
+
+def encode_and(cnf, x, a, b):
+    cnf.add(-x, a)
+    cnf.add(-x, b)
+    cnf.add(x, -a, -b)
+
+
+def encode_or(cnf, x, a, b):
+    cnf.add(-x, a, b)
+    cnf.add(x, -a)
+    cnf.add(x, -b)
+
+
+def encode_imply(cnf, x, a, b):
+    encode_or(cnf, x, -a, b)
+
+
+def encode_equal(cnf, x, a, b):
+    cnf.add(-x, -a, b)
+    cnf.add(-x, a, -b)
+    cnf.add(x, a, b)
+    cnf.add(x, -a, -b)
+
+
+ENCODINGS = {
+    operator.__and__: encode_and,
+    operator.__or__: encode_or,
+    imply: encode_imply,
+    operator.__eq__: encode_equal }
+
+
+BDD_OPS = {
+    operator.__not__: BDD.negate,
+    operator.__and__: BDD.conjoin,
+    operator.__or__: BDD.disjoin,
+    imply: BDD.implies,
+    operator.__eq__: BDD.equals }
+
+
+def columns(n):
+    rows = 1 << n
+    result = []
+    for i in range(n):
+        block = rows >> (i + 1)
+        column, width = (1 << block) - 1, 2 * block
+        while width < rows:
+            column |= column << width
+            width *= 2
+        result.append(column)
+    return result
+
+
+NODES = weakref.WeakValueDictionary()
+
+
+def intern(cls, args):
+    key = (cls,) + args
+    node = NODES.get(key)
+    if node is None:
+        node = object.__new__(cls)
+        NODES[key] = node
+    return node
+
+
+class Compiler(object):
+
+    def __init__(self, symbols, templates, namespace):
+        self.templates = templates
+        self.namespace = namespace
+        self.names = dict((Symbol(name), '_%d' % i) for i, name in enumerate(symbols))
+        self.lines = []
+
+    def emit(self, root):
+        # one assignment per operator node, children first, so the
+        # generated code never nests and any depth of formula compiles
+        for node in root.nodes():
+            if node not in self.names:
+                name = '_t%d' % len(self.lines)
+                self.lines.append('    %s = %s\n' % (name, node.source(self)))
+                self.names[node] = name
+        return self.names[root]
+
+    def source(self, node):
+        return self.names[node]
+
+    def op_source(self, op, operands):
+        if op in self.templates:
+            return self.templates[op] % operands
+        name = '_op%d' % len(self.namespace)
+        self.namespace[name] = op
+        return '%s(%s)' % (name, ', '.join(operands))
 
 
 class BaseExpr(object):
     
     def eval(self, ctx):
         raise NotImplementedError
+
+    def children(self):
+        raise NotImplementedError
+
+    def source(self, compiler):
+        raise NotImplementedError
+
+    def encode(self, cnf, lits):
+        raise NotImplementedError
+
+    def apply(self, bdd, roots):
+        raise NotImplementedError
+
+    def nodes(self):
+        order, seen, stack = [], set(), [(self, False)]
+        while stack:
+            node, done = stack.pop()
+            if done:
+                order.append(node)
+            elif node not in seen:
+                seen.add(node)
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.children()))
+        return order
     
     def find_symbols(self, symbols):
-        raise NotImplementedError
-        
-    def validate(self):
+        symbols = list(symbols)
+        for node in self.nodes():
+            if isinstance(node, Symbol) and node.name not in symbols:
+                symbols.append(node.name)
+        return tuple(symbols)
+
+    def find_ops(self, ops):
+        for node in self.nodes():
+            if not isinstance(node, Symbol):
+                ops.add(node.op)
+        return ops
+
+    def compile(self, symbols=None, templates=TEMPLATES, namespace=None):
+        if symbols is None:
+            symbols = self.find_symbols(())
+        namespace = dict(namespace or {})
+        compiler = Compiler(symbols, templates, namespace)
+        result = compiler.emit(self)
+        code = 'def evaluate(%s):\n%s    return %s\n' % (
+            ', '.join('_%d' % i for i in range(len(symbols))),
+            ''.join(compiler.lines),
+            result)
+        exec(code, namespace)
+        return namespace['evaluate']
+
+    def truth_table(self, symbols=None):
+        if symbols is None:
+            symbols = self.find_symbols(())
+        mask = (1 << (1 << len(symbols))) - 1
+        evaluate = self.compile(symbols, BIT_TEMPLATES, {'_mask': mask})
+        return evaluate(*columns(len(symbols))) & mask, mask
+
+    def tseitin(self, cnf):
+        lits = {}
+        for node in self.nodes():
+            lits[node] = node.encode(cnf, lits)
+        return lits[self]
+
+    def symbol_order(self):
+        # depth first from the root, deeper operand first, so that
+        # symbols meeting in the same subterm end up close together;
+        # reversed, the subterms built first sit at the bottom and each
+        # later operation only has to rebuild the levels above them
+        depth = {}
+        for node in self.nodes():
+            depth[node] = 1 + max([ depth[child] for child in node.children() ] or [0])
+
+        symbols, seen, stack = [], set(), [self]
+        while stack:
+            node = stack.pop()
+            if node not in seen:
+                seen.add(node)
+                if isinstance(node, Symbol):
+                    symbols.append(node.name)
+                stack.extend(sorted(reversed(node.children()), key=depth.get))
+        return tuple(reversed(symbols))
+
+    def diagram(self, bdd=None):
+        order = self.symbol_order()
+        bdd = BDD(order) if bdd is None else bdd
+        for name in order:
+            bdd.add_var(name)
+        roots = {}
+        for node in self.nodes():
+            roots[node] = node.apply(bdd, roots)
+        return bdd, roots[self]
+
+    def choose_engine(self, symbols):
+        ops = self.find_ops(set())
+        if not all(op in BIT_TEMPLATES for op in ops):
+            return 'rows'
+        elif len(symbols) > SAT_THRESHOLD:
+            return 'sat'
+        else:
+            return 'bits'
+
+    def validate(self, engine=None):
         symbols = self.find_symbols(())
-        results = [ 
-            self.eval(dict(zip(symbols, values)))
-                for values in itertools.product(
-                    (True, False),
-                    repeat=len(symbols)) ]
+        engine = engine or self.choose_engine(symbols)
+        return getattr(self, 'validate_' + engine)(symbols)
 
-        if all(results):
+    def validate_bits(self, symbols):
+        table, mask = self.truth_table(symbols)
+        if table == mask:
             return 'V'
-        elif any(results):
+        elif table:
             return 'S'
         else:
             return 'U'
 
+    def validate_sat(self, symbols):
+        cnf = CNF()
+        root = self.tseitin(cnf)
+        if not Solver(cnf.clauses + [[root]], cnf.nvars).solve():
+            return 'U'
+        elif not Solver(cnf.clauses + [[-root]], cnf.nvars).solve():
+            return 'V'
+        else:
+            return 'S'
+
+    def count_models(self, engine=None):
+        symbols = self.find_symbols(())
+        if engine is None:
+            engine = self.choose_engine(symbols)
+            # Tseitin definitions tie every clause into one component,
+            # so above the threshold the diagram counts far faster
+            if engine == 'sat':
+                engine = 'bdd'
+        if engine == 'sat':
+            cnf = CNF()
+            root = self.tseitin(cnf)
+            return model_count(cnf.clauses + [[root]], cnf.nvars, cnf.names.values())
+        elif engine == 'bits':
+            return bin(self.truth_table(symbols)[0]).count('1')
+        elif engine == 'bdd':
+            bdd, root = self.diagram()
+            return bdd.count(root, symbols)
+        else:
+            return sum(1 for model in self.models(engine))
+
+    def models(self, engine=None):
+        symbols = self.find_symbols(())
+        engine = engine or self.choose_engine(symbols)
+        if engine == 'bdd':
+            bdd, root = self.diagram()
+            for model in bdd.models(root, symbols):
+                yield model
+            return
+        elif engine != 'sat':
+            evaluate = self.compile(symbols)
+            for values in itertools.product((True, False), repeat=len(symbols)):
+                if evaluate(*values):
+                    yield dict(zip(symbols, values))
+            return
+
+        cnf = CNF()
+        root = self.tseitin(cnf)
+        solver = Solver(cnf.clauses + [[root]], cnf.nvars)
+        while solver.solve():
+            model = dict((name, solver.model[cnf.names[name]]) for name in symbols)
+            yield model
+            solver.add_clause([ -var if solver.model[var] else var for var in cnf.names.values() ])
+
+    def first_model(self, engine=None):
+        return next(self.models(engine), None)
+
+    def counterexample(self, engine=None):
+        return UnOp(operator.__not__, self).first_model(engine)
+
+    def validate_rows(self, symbols):
+        results = set()
+        for result in itertools.starmap(
+                self.compile(symbols),
+                itertools.product((True, False), repeat=len(symbols))):
+            results.add(bool(result))
+            if len(results) == 2:
+                return 'S'
+
+        if True in results:
+            return 'V'
+        else:
+            return 'U'
+
+    def validate_bdd(self, symbols):
+        bdd, root = self.diagram()
+        if root == TRUE:
+            return 'V'
+        elif root == FALSE:
+            return 'U'
+        else:
+            return 'S'
+
 
 class Symbol(BaseExpr):
 
+    def __new__(cls, name):
+        return intern(cls, (name,))
+
     def __init__(self, name):
         self.name = name
 
+    def __getnewargs__(self):
+        return (self.name,)
+
     def eval(self, ctx):
         return ctx[self.name]
-        
-    def find_symbols(self, symbols):
-        if self.name not in symbols:
-            return symbols + (self.name,)
-        else:
-            return symbols
+
+    def children(self):
+        return ()
+
+    def source(self, compiler):
+        raise KeyError(self.name)
+
+    def encode(self, cnf, lits):
+        return cnf.var(self.name)
+
+    def apply(self, bdd, roots):
+        return bdd.var(self.name)
 
 
 class UnOp(BaseExpr):
 
+    def __new__(cls, op, inner):
+        return intern(cls, (op, inner))
+
     def __init__(self, op, inner):
         self.op = op
         self.inner = inner
+
+    def __getnewargs__(self):
+        return (self.op, self.inner)
         
     def eval(self, ctx):
         return self.op(self.inner.eval(ctx))
 
-    def find_symbols(self, symbols):
-        return self.inner.find_symbols(symbols)
+    def children(self):
+        return (self.inner,)
+
+    def source(self, compiler):
+        return compiler.op_source(self.op, (compiler.source(self.inner),))
+
+    def encode(self, cnf, lits):
+        return -lits[self.inner]
+
+    def apply(self, bdd, roots):
+        return BDD_OPS[self.op](bdd, roots[self.inner])
 
 
 class BinOp(BaseExpr):
+
+    def __new__(cls, op, left, right):
+        return intern(cls, (op, left, right))
     
     def __init__(self, op, left, right):
         self.op = op
         self.left = left
         self.right = right
 
+    def __getnewargs__(self):
+        return (self.op, self.left, self.right)
+
     def eval(self, ctx):
         return self.op(self.left.eval(ctx), self.right.eval(ctx))
-        
-    def find_symbols(self, symbols):
-        return self.right.find_symbols(self.left.find_symbols(symbols))
+
+    def children(self):
+        return (self.left, self.right)
+
+    def source(self, compiler):
+        return compiler.op_source(
+            self.op, (compiler.source(self.left), compiler.source(self.right)))
+
+    def encode(self, cnf, lits):
+        x = cnf.new_var()
+        ENCODINGS[self.op](cnf, x, lits[self.left], lits[self.right])
+        return x
+
+    def apply(self, bdd, roots):
+        return BDD_OPS[self.op](bdd, roots[self.left], roots[self.right])
 
 
 def CONST(regex, op):
@@ -83,7 +424,7 @@ class Parser(SimpleParser):
     t_NOT = CONST(r'\~', operator.__not__)
     t_AND = CONST(r'\&', operator.__and__)
     t_OR = CONST(r'\|', operator.__or__)
-    t_IMPLY = CONST(r'\=\>', lambda a,b: (not a) or b)
+    t_IMPLY = CONST(r'\=\>', imply)
     t_EQUAL = CONST(r'\<\=\>', operator.__eq__)
     t_ignore = ' '
     literals = ['(', ')']
@@ -115,6 +456,71 @@ class Parser(SimpleParser):
 
 
 
+_worker_parser = None
+
+
+def init_worker():
+    global _worker_parser
+    _worker_parser = Parser()
+
+
+def check_formula(task):
+    formula, engine = task
+    return _worker_parser.parse(formula).validate(engine)
+
+
+def check_formulas(formulas, engine=None, workers=1, chunksize=16, cache_size=1<<16):
+    import multiprocessing
+    parser = Parser()
+    cache = {}
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, init_worker)
+
+    try:
+        formulas = ( f.strip() for f in formulas if f.strip() )
+        while True:
+            block = list(itertools.islice(formulas, chunksize * workers * 4))
+            if not block:
+                break
+
+            exprs, known, missing = [], {}, {}
+            for formula in block:
+                try:
+                    expr = parser.parse(formula)
+                except Exception as e:
+                    exprs.append('ERROR: %s' % e)
+                    continue
+                exprs.append(expr)
+                if expr in cache:
+                    known[expr] = cache[expr]
+                else:
+                    missing.setdefault(expr, formula)
+
+            tasks = [ (formula, engine) for formula in missing.values() ]
+            if pool is None:
+                verdicts = [ expr.validate(engine) for expr in missing ]
+            else:
+                verdicts = pool.map(check_formula, tasks, chunksize)
+            known.update(zip(missing, verdicts))
+
+            # the block's verdicts are already in hand, so eviction
+            # cannot lose one that is about to be yielded
+            if len(cache) + len(missing) > cache_size:
+                cache.clear()
+            cache.update(known)
+
+            for expr in exprs:
+                yield known[expr] if isinstance(expr, BaseExpr) else expr
+
+        if pool is not None:
+            pool.close()
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
 class ProposCommand(BaseCommand):
     """
     $ aiclass props
@@ -140,6 +546,81 @@ class ProposCommand(BaseCommand):
     V
     >>> big&dumb<=>~(~big|~dumb)
     V
+    >>> (a=>b)&(b=>c)&(c=>d)&(d=>e)&(e=>f)&(f=>g)&(g=>h)&(h=>i)=>(a=>i)
+    V
+    >>> (a=>b)&(b=>c)&(c=>d)&(d=>e)&(e=>f)&(f=>g)&(g=>h)&(h=>i)=>(i=>a)
+    S
+
+    $ aiclass props
+    >>> \\count p|q
+    3
+    >>> \\models p=>q
+    p q
+    ~p q
+    ~p ~q
+    >>> \\models p&~p
+    none
+    >>> \\count (a=>b)&(b=>c)&(c=>d)&(d=>e)&(e=>f)&(f=>g)&(g=>h)&(h=>i)&(i=>j)&(j=>k)&(k=>l)&(l=>m)&(m=>n)&(n=>o)&(o=>p)&(p=>q)&(q=>r)&(r=>s)&(s=>t)&(t=>u)&(u=>v)&(v=>w)
+    24
+
+    $ aiclass props
+    >>> a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c
+    S
+    >>> \\count a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c
+    7
+
+    $ aiclass props -e rows
+    >>> a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c|a|b|~c
+    S
+
+    $ aiclass props -e sat
+    >>> \\count (p|q)&(q|r)
+    5
+    >>> \\count p&~p
+    0
+    >>> p|~p
+    V
+    >>> p&~p
+    U
+    >>> (smoke=>fire)<=>(smoke|~fire)
+    S
+    >>> (smoke=>fire)<=>(~fire=>~smoke)
+    V
+    >>> big&dumb<=>~(~big|~dumb)
+    V
+
+    $ aiclass props --chunksize 1 --cache 4
+    >>> \\batch p|q, a&b, c|d, e|f, p|q, g|h, x, y
+    S
+    S
+    S
+    S
+    S
+    S
+    S
+    S
+    >>> \\batch p|~p, p&~p, p|~p, p&, p|~p
+    V
+    U
+    V
+    ERROR: Syntax Error!
+    V
+
+    $ aiclass props -e bdd
+    >>> \\equiv smoke=>fire, ~fire=>~smoke
+    yes
+    >>> \\equiv smoke=>fire, ~smoke=>~fire
+    no
+    >>> \\bdd (a<=>b)&(c<=>d)
+    6 nodes
+    >>> \\given smoke : smoke=>fire
+    S
+    >>> \\given smoke ~fire : smoke=>fire
+    U
+    >>> \\count (p|q)&(q|r)
+    5
+    >>> (a=>b)&(b=>c)&(c=>d)&(d=>e)&(e=>f)&(f=>g)&(g=>h)&(h=>i)=>(a=>i)
+    V
     """
 
     
@@ -147,12 +628,73 @@ class ProposCommand(BaseCommand):
     description = 'propositional logic'
     help = 'propositional logic'
 
-    def __init__(self):
+    @classmethod
+    def configure_parser(cls, parser):
+        parser.add_argument(
+            '-e', '--engine',
+            choices=['bdd', 'bits', 'rows', 'sat'],
+            help='validity checker, chosen by symbol count by default')
+        parser.add_argument('-b', '--batch', help='file of formulas, - for stdin')
+        parser.add_argument('-j', '--jobs', default=1, type=int, help='worker processes for batch formulas')
+        parser.add_argument('--chunksize', default=16, type=int, help='batch formulas sent to a worker at once')
+        parser.add_argument('--cache', default=1<<16, type=int, help='batch verdicts kept for repeated formulas')
+
+    @classmethod
+    def create_from_args(cls, args):
+        return cls(args.engine, args.batch, args.jobs, args.chunksize, args.cache)
+
+    def __init__(self, engine=None, batch=None, jobs=1, chunksize=16, cache_size=1<<16):
         self.parser = Parser()
+        self.engine = engine
+        self.batch = batch
+        self.jobs = jobs
+        self.chunksize = chunksize
+        self.cache_size = cache_size
+        self.bdd = BDD()
+
+    def loop(self):
+        if self.batch is None:
+            return BaseCommand.loop(self)
+
+        f = sys.stdin if self.batch == '-' else open(self.batch, 'r')
+        try:
+            for verdict in self.check(f):
+                print(verdict)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        raise SystemExit
+
+    def check(self, formulas):
+        return check_formulas(formulas, self.engine, self.jobs, self.chunksize, self.cache_size)
+
+    def format_model(self, model):
+        return ' '.join(name if value else '~' + name for name, value in sorted(model.items()))
 
     def call(self, string):
         if string == r'\q':
             raise SystemExit
+        elif string.startswith('\\count '):
+            return self.parser.parse(string[7:]).count_models(self.engine)
+        elif string.startswith('\\models '):
+            models = self.parser.parse(string[8:]).models(self.engine)
+            return '\n'.join(self.format_model(model) for model in models) or 'none'
+        elif string.startswith('\\batch '):
+            return '\n'.join(self.check(string[7:].split(',')))
+        elif string.startswith('\\bdd '):
+            bdd, root = self.parser.parse(string[5:]).diagram(self.bdd)
+            return '%d nodes' % bdd.size(root)
+        elif string.startswith('\\equiv '):
+            left, right = [ self.parser.parse(s).diagram(self.bdd)[1] for s in string[7:].split(',', 1) ]
+            return 'yes' if left == right else 'no'
+        elif string.startswith('\\given '):
+            literals, formula = string[7:].split(':', 1)
+            bdd, root = self.parser.parse(formula).diagram(self.bdd)
+            for literal in literals.split():
+                name = literal.lstrip('~')
+                bdd.add_var(name)
+                root = bdd.restrict(root, name, not literal.startswith('~'))
+            return 'V' if root == TRUE else 'U' if root == FALSE else 'S'
 
-        return self.parser.parse(string).validate()
+        return self.parser.parse(string).validate(self.engine)
 
@@ -0,0 +1,430 @@
+from aiclass.search import Problem, ReversedProblem, CfsSearcher
+import collections, hashlib, heapq, pickle
+
+
+class QueryProblem(Problem):
+
+
+    def __init__(self, problem, initial, goal=None):
+        self.problem = problem
+        self.initial = initial
+        self.goal = goal
+
+
+    def actions(self, state):
+        return self.problem.actions(state)
+
+
+    def result(self, action):
+        return self.problem.result(action)
+
+
+    def cost(self, action):
+        return self.problem.cost(action)
+
+
+    def get_initial(self):
+        return self.initial
+
+
+    def goal_test(self, state):
+        return state == self.goal
+
+
+    def heuristic(self, state):
+        return self.problem.estimate(state, self.goal)
+
+
+    def estimate(self, state, goal):
+        return self.problem.estimate(state, goal)
+
+
+    def get_goal(self):
+        return self.goal
+
+
+    def reverse_actions(self, state):
+        return self.problem.reverse_actions(state)
+
+
+    def get_name(self, state):
+        return self.problem.get_name(state)
+
+
+    def get_state(self, name):
+        return self.problem.get_state(name)
+
+
+
+class Router(object):
+    cache_size = 64
+
+
+    def __init__(self, problem, cache_size=None):
+        self.problem = problem
+        if cache_size is not None:
+            self.cache_size = cache_size
+        self.trees = collections.OrderedDict()
+
+
+    def get_tree(self, initial):
+        tree = self.trees.pop(initial, None)
+        if tree is None:
+            tree = CfsSearcher(QueryProblem(self.problem, initial))
+            if len(self.trees) >= self.cache_size:
+                self.trees.popitem(last=False)
+        self.trees[initial] = tree
+        return tree
+
+
+    def route(self, initial, goal):
+        if initial is None or goal is None:
+            return None
+        tree = self.get_tree(initial)
+        while not tree.is_explored(goal):
+            if not tree._frontier:
+                return None
+            tree.expand()
+        return tree.path_cost(goal), tree.trace_states(goal)
+
+
+    def routes(self, queries):
+        for initial, goal in queries:
+            yield initial, goal, self.route(initial, goal)
+
+
+
+class Landmarks(object):
+
+
+    def __init__(self, problem, count, symmetric=False, start=None):
+        self.problem = problem
+        self.landmarks = []
+        self.tables = []
+
+        coverage = self.distances(problem.get_initial() if start is None else start)
+        for i in range(count):
+            landmark = self.farthest(coverage)
+            if landmark is None:
+                break
+            forward = self.distances(landmark)
+            backward = forward if symmetric else self.distances(landmark, reverse=True)
+            self.landmarks.append(landmark)
+            self.tables.append((forward, backward))
+            if i == 0:
+                coverage = dict(forward)
+            else:
+                for state, cost in forward.items():
+                    if cost < coverage.get(state, cost + 1):
+                        coverage[state] = cost
+
+
+    def distances(self, source, reverse=False):
+        problem = ReversedProblem(self.problem) if reverse else self.problem
+        tree = CfsSearcher(QueryProblem(problem, source))
+        tree.search()
+        return tree.g
+
+
+    def farthest(self, coverage):
+        best, landmark = 0, None
+        for state, cost in coverage.items():
+            if cost > best and state not in self.landmarks:
+                best, landmark = cost, state
+        return landmark
+
+
+    def estimate(self, state, goal):
+        best = 0
+        for forward, backward in self.tables:
+            to_goal, to_state = forward.get(goal), forward.get(state)
+            if to_goal is not None and to_state is not None and to_goal - to_state > best:
+                best = to_goal - to_state
+            from_state, from_goal = backward.get(state), backward.get(goal)
+            if from_state is not None and from_goal is not None and from_state - from_goal > best:
+                best = from_state - from_goal
+        return best
+
+
+
+def graph_digest(problem, states, limit=None):
+    digest = hashlib.sha1()
+    queue = list(states)
+    seen = set(queue)
+    for state in queue:
+        if limit is not None and len(seen) > limit:
+            return None
+        for action in problem.actions(state):
+            next_state = problem.result(action)
+            digest.update(('%r\0%r\0%r\n' % (state, next_state, problem.cost(action))).encode('utf-8'))
+            if next_state not in seen:
+                seen.add(next_state)
+                queue.append(next_state)
+    return digest.hexdigest()
+
+
+
+class ContractionHierarchy(object):
+    witness_limit = 20000
+    estimate_limit = 200
+    hop_limit = 8
+
+
+    def __init__(self, problem, states):
+        states = list(states)
+        self.states = []
+        self.ids = {}
+        self.actions = {}
+        self.middle = {}
+        self.digest = graph_digest(problem, states)
+
+        out, inn = [], []
+        for state in states:
+            self.add_state(state, out, inn)
+
+        u = 0
+        while u < len(self.states):
+            for action in problem.actions(self.states[u]):
+                v = self.add_state(problem.result(action), out, inn)
+                cost = problem.cost(action)
+                if u != v and (v not in out[u] or cost < out[u][v]):
+                    out[u][v] = inn[v][u] = cost
+                    self.actions[(u, v)] = action
+            u += 1
+
+        self.contract(out, inn)
+
+
+    def add_state(self, state, out, inn):
+        if state not in self.ids:
+            self.ids[state] = len(self.states)
+            self.states.append(state)
+            out.append({})
+            inn.append({})
+        return self.ids[state]
+
+
+    def witness(self, source, skip, limit, targets, out, budget, hops):
+        # the budget counts scanned edges, so the search stays cheap in the
+        # dense top of the hierarchy; stopping early only adds shortcuts
+        dist = {source: 0}
+        heap = [(0, 0, source)]
+        remaining, scanned = len(targets), 0
+        get, push, pop = dist.get, heapq.heappush, heapq.heappop
+        while heap and remaining and scanned < budget:
+            d, h, u = pop(heap)
+            if d > dist[u]:
+                continue
+            scanned += len(out[u])
+            if u in targets:
+                remaining -= 1
+            if h < hops:
+                for v, c in out[u].items():
+                    c += d
+                    if c <= limit and v != skip and c < get(v, c + 1):
+                        dist[v] = c
+                        push(heap, (c, h + 1, v))
+        return dist
+
+
+    def shortcuts(self, v, out, inn, budget, hops=None):
+        shortcuts = []
+        for u, cu in inn[v].items():
+            targets = dict((w, cu + cw) for w, cw in out[v].items() if w != u)
+            if not targets:
+                continue
+            dist = self.witness(u, v, max(targets.values()), targets, out, budget, hops or len(self.states))
+            for w, cost in targets.items():
+                if dist.get(w, cost + 1) > cost:
+                    shortcuts.append((u, w, cost))
+        return shortcuts
+
+
+    def contract(self, out, inn):
+        n = len(self.states)
+        deleted = [0] * n
+        self.rank = [0] * n
+        self.up = [None] * n
+        self.down = [None] * n
+
+        def priority(v):
+            shortcuts = self.shortcuts(v, out, inn, self.estimate_limit)
+            return len(shortcuts) - len(out[v]) - len(inn[v]) + deleted[v]
+
+        heap = [ (priority(v), v) for v in range(n) ]
+        heapq.heapify(heap)
+        order = 0
+        while heap:
+            p, v = heapq.heappop(heap)
+            p = priority(v)
+            if heap and p > heap[0][0]:
+                heapq.heappush(heap, (p, v))
+                continue
+
+            for u, w, cost in self.shortcuts(v, out, inn, self.witness_limit, self.hop_limit):
+                out[u][w] = inn[w][u] = cost
+                self.middle[(u, w)] = v
+            self.up[v] = list(out[v].items())
+            self.down[v] = list(inn[v].items())
+            for w in out[v]:
+                del inn[w][v]
+                deleted[w] += 1
+            for u in inn[v]:
+                del out[u][v]
+                deleted[u] += 1
+            out[v] = inn[v] = None
+            self.rank[v] = order
+            order += 1
+
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'rb') as f:
+            return pickle.load(f)
+
+
+    def query(self, initial, goal):
+        return HierarchyQuery(self, self.ids.get(initial), self.ids.get(goal))
+
+
+    def unpack(self, path):
+        states = [(self.states[path[0]], None)]
+        for u, w in zip(path, path[1:]):
+            stack = [(u, w)]
+            while stack:
+                a, b = stack.pop()
+                m = self.middle.get((a, b))
+                if m is None:
+                    states.append((self.states[b], self.actions[(a, b)]))
+                else:
+                    stack.append((m, b))
+                    stack.append((a, m))
+        return states
+
+
+    def route(self, initial, goal):
+        query = self.query(initial, goal)
+        while not query.done():
+            query.step()
+        if query.meeting is None:
+            return None
+        return query.best, [ s for s, a in self.unpack(query.path()) ]
+
+
+    def routes(self, queries):
+        for initial, goal in queries:
+            yield initial, goal, self.route(initial, goal)
+
+
+
+class HierarchyQuery(object):
+
+
+    def __init__(self, hierarchy, initial, goal):
+        self.hierarchy = hierarchy
+        self.edges = [hierarchy.up, hierarchy.down]
+        self.dist = [{}, {}]
+        self.parent = [{}, {}]
+        self.heaps = [[], []]
+        self.settled = set()
+        self.best = None
+        self.meeting = None
+        if initial is not None and goal is not None:
+            for side, node in enumerate((initial, goal)):
+                self.dist[side][node] = 0
+                self.parent[side][node] = None
+                self.heaps[side].append((0, node))
+            self.meet(initial)
+
+
+    def meet(self, node):
+        if node in self.dist[0] and node in self.dist[1]:
+            cost = self.dist[0][node] + self.dist[1][node]
+            if self.best is None or cost < self.best:
+                self.best, self.meeting = cost, node
+
+
+    def bound(self, side):
+        heap, dist = self.heaps[side], self.dist[side]
+        while heap and heap[0][0] > dist[heap[0][1]]:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+
+    def done(self):
+        bounds = [ b for b in (self.bound(0), self.bound(1)) if b is not None ]
+        return not bounds or self.best is not None and min(bounds) >= self.best
+
+
+    def step(self):
+        forward, backward = self.bound(0), self.bound(1)
+        side = 0 if backward is None or forward is not None and forward <= backward else 1
+        d, u = heapq.heappop(self.heaps[side])
+        dist, parent = self.dist[side], self.parent[side]
+        self.settled.add(u)
+
+        # a higher node already reaching u more cheaply means no
+        # shortest path continues upwards from u on this side
+        for v, c in self.edges[1 - side][u]:
+            if v in dist and dist[v] + c < d:
+                return self.hierarchy.states[u]
+
+        for v, c in self.edges[side][u]:
+            if d + c < dist.get(v, d + c + 1):
+                dist[v] = d + c
+                parent[v] = u
+                heapq.heappush(self.heaps[side], (d + c, v))
+                self.meet(v)
+        return self.hierarchy.states[u]
+
+
+    def path(self):
+        path, node = [], self.meeting
+        while node is not None:
+            path.insert(0, node)
+            node = self.parent[0][node]
+        node = self.parent[1][self.meeting]
+        while node is not None:
+            path.append(node)
+            node = self.parent[1][node]
+        return path
+
+
+
+def parse_queries(lines):
+    for line in lines:
+        line = line.strip()
+        if line:
+            a, b = line.split('->', 1)
+            yield a.strip(), b.strip()
+
+
+
+_worker_router = None
+
+
+def init_worker(problem, router=None):
+    global _worker_router
+    _worker_router = Router(problem) if router is None else router
+
+
+def route_query(query):
+    initial, goal = query
+    return initial, goal, _worker_router.route(initial, goal)
+
+
+def parallel_routes(problem, queries, workers=None, chunksize=16, router=None):
+    import multiprocessing
+    pool = multiprocessing.Pool(workers, init_worker, (problem, router))
+    try:
+        for result in pool.imap(route_query, queries, chunksize):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
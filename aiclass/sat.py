@@ -0,0 +1,347 @@
+import heapq
+
+
+class CNF(object):
+
+
+    def __init__(self):
+        self.names = {}
+        self.nvars = 0
+        self.clauses = []
+
+
+    def new_var(self):
+        self.nvars += 1
+        return self.nvars
+
+
+    def var(self, name):
+        if name not in self.names:
+            self.names[name] = self.new_var()
+        return self.names[name]
+
+
+    def add(self, *lits):
+        self.clauses.append(list(lits))
+
+
+
+def luby(i):
+    size, seq = 1, 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i = i % size
+    return 1 << seq
+
+
+
+class Solver(object):
+    restart_base = 100
+    decay = 0.95
+
+
+    def __init__(self, clauses=(), nvars=0):
+        self.nvars = 0
+        self.value = [None]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.polarity = [False]
+        self.watches = {}
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.order = []
+        self.var_inc = 1.0
+        self.conflicts = 0
+        self.learnts = 0
+        self.unsat = False
+        self.model = None
+
+        self.ensure(nvars)
+        for clause in clauses:
+            self.add_clause(clause)
+
+
+    def ensure(self, nvars):
+        for var in range(self.nvars + 1, nvars + 1):
+            self.value.append(None)
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.polarity.append(False)
+            self.watches[var], self.watches[-var] = [], []
+            heapq.heappush(self.order, (0.0, var))
+        self.nvars = max(self.nvars, nvars)
+
+
+    def lit_value(self, lit):
+        value = self.value[abs(lit)]
+        if value is None or lit > 0:
+            return value
+        return not value
+
+
+    def add_clause(self, clause):
+        if self.unsat:
+            return
+        self.ensure(max([abs(lit) for lit in clause] or [0]))
+
+        lits = []
+        for lit in clause:
+            if -lit in lits:
+                return
+            if lit not in lits and self.lit_value(lit) is not False:
+                if self.lit_value(lit) is True and self.level[abs(lit)] == 0:
+                    return
+                lits.append(lit)
+
+        if not lits:
+            self.unsat = True
+        elif len(lits) == 1:
+            self.enqueue(lits[0], None)
+            self.unsat = self.propagate() is not None
+        else:
+            self.watches[lits[0]].append(lits)
+            self.watches[lits[1]].append(lits)
+
+
+    def enqueue(self, lit, reason):
+        var = abs(lit)
+        self.value[var] = lit > 0
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+
+    def propagate(self):
+        trail, watches, lit_value = self.trail, self.watches, self.lit_value
+        while self.qhead < len(trail):
+            false_lit = -trail[self.qhead]
+            self.qhead += 1
+            watching, kept = watches[false_lit], []
+
+            for i, clause in enumerate(watching):
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                if lit_value(first) is True:
+                    kept.append(clause)
+                    continue
+
+                for k in range(2, len(clause)):
+                    if lit_value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], false_lit
+                        watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if lit_value(first) is False:
+                        kept.extend(watching[i+1:])
+                        watches[false_lit] = kept
+                        self.qhead = len(trail)
+                        return clause
+                    self.enqueue(first, clause)
+
+            watches[false_lit] = kept
+        return None
+
+
+    def bump(self, var):
+        self.activity[var] += self.var_inc
+        if self.activity[var] > 1e100:
+            for v in range(1, self.nvars + 1):
+                self.activity[v] *= 1e-100
+            self.var_inc *= 1e-100
+            self.order = [ (-self.activity[v], v) for v in range(1, self.nvars + 1) if self.value[v] is None ]
+            heapq.heapify(self.order)
+        elif self.value[var] is None:
+            heapq.heappush(self.order, (-self.activity[var], var))
+
+
+    def analyze(self, conflict):
+        level, reason, trail = self.level, self.reason, self.trail
+        current = len(self.trail_lim)
+        seen, learnt = set(), [None]
+        counter, lit, index, clause = 0, None, len(trail) - 1, conflict
+
+        while True:
+            for q in clause:
+                var = abs(q)
+                if q != lit and var not in seen and level[var] > 0:
+                    seen.add(var)
+                    self.bump(var)
+                    if level[var] == current:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+            while abs(trail[index]) not in seen:
+                index -= 1
+            lit = trail[index]
+            index -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = reason[abs(lit)]
+
+        learnt[0] = -lit
+        back = 0
+        if len(learnt) > 1:
+            best = max(range(1, len(learnt)), key=lambda i: level[abs(learnt[i])])
+            learnt[1], learnt[best] = learnt[best], learnt[1]
+            back = level[abs(learnt[1])]
+        return learnt, back
+
+
+    def cancel_until(self, level):
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for lit in self.trail[start:]:
+            var = abs(lit)
+            self.polarity[var] = lit > 0
+            self.value[var] = None
+            self.reason[var] = None
+            heapq.heappush(self.order, (-self.activity[var], var))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+
+    def pick(self):
+        while self.order:
+            activity, var = heapq.heappop(self.order)
+            if self.value[var] is None and -activity == self.activity[var]:
+                return var
+        for var in range(1, self.nvars + 1):
+            if self.value[var] is None:
+                return var
+        return None
+
+
+    def solve(self):
+        if self.unsat or self.propagate() is not None:
+            self.unsat = True
+            return False
+
+        restarts, budget = 0, self.restart_base * luby(0)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.trail_lim:
+                    self.unsat = True
+                    return False
+                learnt, back = self.analyze(conflict)
+                self.cancel_until(back)
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    self.watches[learnt[0]].append(learnt)
+                    self.watches[learnt[1]].append(learnt)
+                    self.enqueue(learnt[0], learnt)
+                    self.learnts += 1
+                self.var_inc /= self.decay
+                self.conflicts += 1
+                budget -= 1
+                if budget == 0:
+                    restarts += 1
+                    budget = self.restart_base * luby(restarts)
+                    self.cancel_until(0)
+            else:
+                var = self.pick()
+                if var is None:
+                    self.model = dict((v, self.value[v]) for v in range(1, self.nvars + 1))
+                    self.cancel_until(0)
+                    return True
+                self.trail_lim.append(len(self.trail))
+                self.enqueue(var if self.polarity[var] else -var, None)
+
+
+
+def condition(clauses, lits):
+    result = []
+    for clause in clauses:
+        if not clause.isdisjoint(lits):
+            continue
+        for lit in clause:
+            if -lit in lits:
+                clause = frozenset(l for l in clause if -l not in lits)
+                if not clause:
+                    return None
+                break
+        result.append(clause)
+    return result
+
+
+def components(clauses):
+    parent = {}
+
+    def find(var):
+        while parent.setdefault(var, var) != var:
+            parent[var] = parent[parent[var]]
+            var = parent[var]
+        return var
+
+    for clause in clauses:
+        vars = [ find(abs(lit)) for lit in clause ]
+        for var in vars[1:]:
+            parent[find(var)] = find(vars[0])
+
+    groups = {}
+    for clause in clauses:
+        groups.setdefault(find(abs(next(iter(clause)))), []).append(clause)
+    return list(groups.values())
+
+
+def model_count(clauses, nvars, decisions=None, cache=None):
+    cache = {} if cache is None else cache
+    clauses = [ frozenset(c) for c in clauses if not any(-lit in c for lit in c) ]
+    if any(not c for c in clauses):
+        return 0
+    return count_free(clauses, set(range(1, nvars + 1)), set(decisions or ()), cache)
+
+
+def count_free(clauses, variables, decisions, cache):
+    variables = set(variables)
+    while True:
+        units = set(next(iter(c)) for c in clauses if len(c) == 1)
+        if not units:
+            break
+        if any(-lit in units for lit in units):
+            return 0
+        clauses = condition(clauses, units)
+        if clauses is None:
+            return 0
+        variables.difference_update(abs(lit) for lit in units)
+
+    count = 1
+    for component in components(set(clauses)):
+        count *= count_component(component, decisions, cache)
+        if count == 0:
+            return 0
+        variables.difference_update(abs(lit) for clause in component for lit in clause)
+    return count << len(variables)
+
+
+def count_component(clauses, decisions, cache):
+    key = frozenset(clauses)
+    if key not in cache:
+        occurrences = {}
+        for clause in clauses:
+            for lit in clause:
+                occurrences[abs(lit)] = occurrences.get(abs(lit), 0) + 1
+        var = max(occurrences, key=lambda v: (v in decisions, occurrences[v]))
+        variables = set(occurrences)
+        variables.discard(var)
+
+        count = 0
+        for lit in (var, -var):
+            conditioned = condition(clauses, frozenset([lit]))
+            if conditioned is not None:
+                count += count_free(conditioned, variables, decisions, cache)
+        cache[key] = count
+    return cache[key]
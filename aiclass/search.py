@@ -1,5 +1,9 @@
+from __future__ import print_function
+
 from aiclass.command import BaseCommand
-from aiclass.parser import parse_graph
+from aiclass.parser import parse_graph, iter_lines
+from aiclass.graph import CompactGraph, HeuristicTable
+import collections, heapq, inspect, itertools, os.path, sys
 
 
 class Problem(object):
@@ -29,32 +33,120 @@ class Problem(object):
         raise NotImplementedError
 
 
+    def estimate(self, state, goal):
+        raise NotImplementedError
+
+
+    def get_goal(self):
+        raise NotImplementedError
+
+
+    def reverse_actions(self, state):
+        raise NotImplementedError
+
+
+    def get_name(self, state):
+        return state
+
+
+    def get_state(self, name):
+        return name
+
+
+    def all_states(self):
+        return [self.get_initial()]
+
+
+
+class ReversedProblem(Problem):
+
+
+    def __init__(self, problem):
+        self.problem = problem
+
+
+    def actions(self, state):
+        return self.problem.reverse_actions(state)
+
+
+    def result(self, action):
+        return self.problem.result(action)
+
+
+    def cost(self, action):
+        return self.problem.cost(action)
+
+
+    def get_initial(self):
+        return self.problem.get_goal()
+
+
+    def goal_test(self, state):
+        return state == self.problem.get_initial()
+
+
+    def get_goal(self):
+        return self.problem.get_initial()
+
+
+    def reverse_actions(self, state):
+        return self.problem.actions(state)
+
+
+    def get_name(self, state):
+        return self.problem.get_name(state)
+
+
+    def get_state(self, name):
+        return self.problem.get_state(name)
+
+
 
 class Searcher(object):
+    journaled = True
 
 
     def __init__(self, problem, depth_limit=None):
         self.problem = problem
-        self._frontier = []
         self.depth_limit = depth_limit
         self.goal_reached = None
         self.expand_count = 0
+        self.frontier_peak = 0
 
         self.path_to = {self.problem.get_initial(): (None, None)}
+        self.g = {self.problem.get_initial(): 0}
+        self._children = {}
+        self._in_frontier = set()
+        self._frontier = self.create_frontier()
         self.add_to_frontier(self.problem.get_initial(), 0)
 
 
+    def create_frontier(self):
+        return []
+
+
     def add_to_frontier(self, state, depth):
         if self.depth_limit is None or depth < self.depth_limit:
             self._frontier.append((state, depth))
+            self._in_frontier.add(state)
+            if len(self._frontier) > self.frontier_peak:
+                self.frontier_peak = len(self._frontier)
 
 
     def get_next_from_frontier(self):
         raise NotImplementedError
 
 
+    def in_frontier(self, state):
+        return state in self._in_frontier
+
+
     def is_visited(self, state):
         return state in self.path_to
+
+
+    def is_explored(self, state):
+        return state in self.path_to and state not in self._in_frontier
         
     
     def get_visited(self):
@@ -62,40 +154,73 @@ class Searcher(object):
         
     
     def get_explored(self):
-        return [ s for s in self.path_to.keys() if s not in map(lambda f: f[0], self._frontier) ]
+        return [ s for s in self.path_to if s not in self._in_frontier ]
+
+
+    def get_frontier(self):
+        return [ f[0] for f in self._frontier ]
+
+
+    def frontier_size(self):
+        return len(self._frontier)
 
 
     def log_path(self, from_state, action, to_state):
+        improved = to_state in self.path_to
+        if improved:
+            self._children[self.path_to[to_state][0]].remove(to_state)
+
         self.path_to[to_state] = from_state, action
+        self._children.setdefault(from_state, []).append(to_state)
+        self.g[to_state] = self.g[from_state] + self.problem.cost(action)
+
+        if improved:
+            self.update_costs(to_state)
+
+
+    def update_costs(self, state):
+        stack = [state]
+        while stack:
+            state = stack.pop()
+            self.cost_changed(state)
+            for child in self._children.get(state, ()):
+                self.g[child] = self.g[state] + self.problem.cost(self.path_to[child][1])
+                stack.append(child)
+
+
+    def cost_changed(self, state):
+        pass
 
 
     def path_cost(self, to_state):
-        from_state, action = self.path_to[to_state]
-        if from_state is None:
-            return 0
-        return self.path_cost(from_state) + self.problem.cost(action)
+        return self.g[to_state]
 
 
     def expand(self):
         state, depth = self.get_next_from_frontier()
+        self._in_frontier.discard(state)
         self.expand_count += 1
 
         if self.problem.goal_test(state):
             self.goal_reached = state
         else:
-            for action in self.problem.actions(state):
-                next_state = self.problem.result(action)
-            
-                if self.is_visited(next_state):
-                    if self.path_cost(state) + self.problem.cost(action) < self.path_cost(next_state):
-                        self.log_path(state, action, next_state)
-                else:
-                    self.add_to_frontier(next_state, depth+1)
-                    self.log_path(state, action, next_state)
+            self.expand_state(state, depth)
 
         return state
 
 
+    def expand_state(self, state, depth):
+        for action in self.problem.actions(state):
+            next_state = self.problem.result(action)
+
+            if self.is_visited(next_state):
+                if self.g[state] + self.problem.cost(action) < self.g[next_state]:
+                    self.log_path(state, action, next_state)
+            else:
+                self.log_path(state, action, next_state)
+                self.add_to_frontier(next_state, depth+1)
+
+
     def search(self):
         while self.goal_reached is None:
             if not self._frontier:
@@ -122,40 +247,566 @@ class Searcher(object):
         return path
 
 
+class Stack(object):
+
+
+    def __init__(self):
+        self._items = []
+        self._pending = []
+        self._counter = itertools.count()
+
+
+    def __len__(self):
+        return len(self._items) + len(self._pending)
+
+
+    def __iter__(self):
+        return ( item for seq, item in sorted(self._items + self._pending) )
+
+
+    def append(self, item):
+        self._pending.append((next(self._counter), item))
+
+
+    def pop(self):
+        if self._pending:
+            self._items.extend(reversed(self._pending))
+            self._pending = []
+        return self._items.pop()[1]
+
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['_counter'] = next(self._counter)
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._counter = itertools.count(state['_counter'])
+
+
+
 class DfsSearcher(Searcher):
 
 
+    def create_frontier(self):
+        return Stack()
+
+
     def get_next_from_frontier(self):
-        item = max(self._frontier, key=lambda i: i[1])
-        self._frontier.remove(item)
-        return item
+        return self._frontier.pop()
 
 
 
 class BfsSearcher(Searcher):
 
 
+    def create_frontier(self):
+        return collections.deque()
+
+
     def get_next_from_frontier(self):
-        return self._frontier.pop(0)
+        return self._frontier.popleft()
+
+
+
+class PriorityQueue(object):
+
+
+    def __init__(self, priority):
+        self.priority = priority
+        self._heap = []
+        self._entries = {}
+        self._counter = itertools.count()
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def __iter__(self):
+        for entry in sorted(self._entries.values(), key=lambda e: e[1]):
+            yield entry[2], entry[3]
+
+
+    def __contains__(self, state):
+        return state in self._entries
+
+
+    def append(self, item):
+        state, depth = item
+        entry = [self.priority(state), next(self._counter), state, depth]
+        self._entries[state] = entry
+        heapq.heappush(self._heap, entry)
+
+
+    def update(self, state):
+        old = self._entries[state]
+        entry = [self.priority(state), old[1], state, old[3]]
+        self._entries[state] = entry
+        heapq.heappush(self._heap, entry)
+
+
+    def pop(self):
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            if self._entries.get(entry[2]) is entry:
+                del self._entries[entry[2]]
+                return entry[2], entry[3]
+        raise IndexError('pop from empty frontier')
+
+
+    def peek(self):
+        while self._heap:
+            entry = self._heap[0]
+            if self._entries.get(entry[2]) is entry:
+                return entry[0]
+            heapq.heappop(self._heap)
+        raise IndexError('peek from empty frontier')
+
+
+    def __getstate__(self):
+        # the priority is a method of the searcher, which sets it again
+        state = dict(self.__dict__)
+        del state['priority']
+        state['_counter'] = next(self._counter)
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._counter = itertools.count(state['_counter'])
+
+
+
+class BeamQueue(PriorityQueue):
+
+
+    def __init__(self, priority):
+        PriorityQueue.__init__(self, priority)
+        self._worst = []
 
 
+    def append(self, item):
+        PriorityQueue.append(self, item)
+        self.push_worst(self._entries[item[0]])
 
-class CfsSearcher(Searcher):
+
+    def update(self, state):
+        PriorityQueue.update(self, state)
+        self.push_worst(self._entries[state])
+
+
+    def push_worst(self, entry):
+        if len(self._worst) > 2 * len(self._entries) + 16:
+            self._heap = list(self._entries.values())
+            heapq.heapify(self._heap)
+            self._worst = [ (-e[0], -e[1], e) for e in self._heap ]
+            heapq.heapify(self._worst)
+        else:
+            heapq.heappush(self._worst, (-entry[0], -entry[1], entry))
+
+
+    def pop_worst(self):
+        while self._worst:
+            entry = heapq.heappop(self._worst)[2]
+            if self._entries.get(entry[2]) is entry:
+                del self._entries[entry[2]]
+                return entry[2], entry[3]
+        raise IndexError('pop from empty frontier')
+
+
+
+class PrioritySearcher(Searcher):
+
+
+    def create_frontier(self):
+        return PriorityQueue(self.priority)
+
+
+    def priority(self, state):
+        raise NotImplementedError
 
 
     def get_next_from_frontier(self):
-        item = min(self._frontier, key=lambda i: self.path_cost(i[0]))
-        self._frontier.remove(item)
-        return item
+        return self._frontier.pop()
+
+
+    def cost_changed(self, state):
+        if state in self._in_frontier:
+            self._frontier.update(state)
+
+
+
+class CfsSearcher(PrioritySearcher):
+
+
+    def priority(self, state):
+        return self.g[state]
+
+
+
+class AstarSearcher(PrioritySearcher):
+
+
+    def priority(self, state):
+        return self.g[state] + self.problem.heuristic(state)
+
+
+
+class BeamSearcher(AstarSearcher):
+    width = 100
+
+
+    def __init__(self, problem, depth_limit=None, width=None):
+        if width is not None:
+            self.width = width
+        AstarSearcher.__init__(self, problem, depth_limit)
 
 
-class AstarSearcher(Searcher):
+    def create_frontier(self):
+        return BeamQueue(self.priority)
+
+
+    def add_to_frontier(self, state, depth):
+        if self.depth_limit is None or depth < self.depth_limit:
+            self._frontier.append((state, depth))
+            self._in_frontier.add(state)
+            if len(self._frontier) > self.width:
+                self.forget(self._frontier.pop_worst()[0])
+            if len(self._frontier) > self.frontier_peak:
+                self.frontier_peak = len(self._frontier)
+
+
+    def forget(self, state):
+        self._in_frontier.discard(state)
+        self._children[self.path_to[state][0]].remove(state)
+        del self.path_to[state]
+        del self.g[state]
+
+
+
+class IdaSearcher(Searcher):
+    journaled = False
+
+
+    def __init__(self, problem, depth_limit=None):
+        self.problem = problem
+        self.depth_limit = depth_limit
+        self.goal_reached = None
+        self.expand_count = 0
+        self.frontier_peak = 0
+        self.current = None
+
+        self.bound = problem.heuristic(problem.get_initial())
+        self.restart()
+
+
+    def restart(self):
+        initial = self.problem.get_initial()
+        self.next_bound = None
+        self._frontier = [(initial, 0, 0, None, None)]
+        self.path_to = {initial: (None, None)}
+        self.g = {initial: 0}
+
+
+    def on_path(self, node, state):
+        while node is not None:
+            if node[0] == state:
+                return True
+            node = node[3]
+        return False
+
+
+    def record_path(self, node):
+        self.path_to, self.g = {}, {}
+        while node is not None:
+            state, depth, g, parent, action = node
+            self.path_to[state] = (parent[0] if parent else None), action
+            self.g[state] = g
+            node = parent
 
 
     def get_next_from_frontier(self):
-        item = min(self._frontier, key=lambda i: self.path_cost(i[0]) + self.problem.heuristic(i[0]))
-        self._frontier.remove(item)
-        return item
+        while True:
+            if not self._frontier:
+                if self.next_bound is None:
+                    return None
+                self.bound = self.next_bound
+                self.restart()
+
+            node = self._frontier.pop()
+            f = node[2] + self.problem.heuristic(node[0])
+            if f <= self.bound:
+                return node
+            if self.next_bound is None or f < self.next_bound:
+                self.next_bound = f
+
+
+    def expand(self):
+        node = self.get_next_from_frontier()
+        if node is None:
+            return None
+
+        state, depth, g, parent, action = node
+        self.current = node
+        self.expand_count += 1
+
+        if self.problem.goal_test(state):
+            self.goal_reached = state
+            self.record_path(node)
+        elif self.depth_limit is None or depth + 1 < self.depth_limit:
+            children = []
+            for action in self.problem.actions(state):
+                next_state = self.problem.result(action)
+                if not self.on_path(node, next_state):
+                    children.append((next_state, depth+1, g + self.problem.cost(action), node, action))
+            self._frontier.extend(reversed(children))
+            if len(self._frontier) > self.frontier_peak:
+                self.frontier_peak = len(self._frontier)
+
+        return state
+
+
+    def search(self):
+        while self.goal_reached is None:
+            if not self._frontier and self.next_bound is None:
+                return
+            self.expand()
+        return self.goal_reached
+
+
+    def is_visited(self, state):
+        return self.on_path(self.current, state)
+
+
+    def get_visited(self):
+        return self.get_explored()
+
+
+    def get_explored(self):
+        node, path = self.current, []
+        while node is not None:
+            path = [node[0]] + path
+            node = node[3]
+        return path
+
+
+    def get_frontier(self):
+        return [ n[0] for n in reversed(self._frontier) ]
+
+
+
+class SearchFront(CfsSearcher):
+
+
+    def __init__(self, problem, owner):
+        self.owner = owner
+        CfsSearcher.__init__(self, problem)
+
+
+    def expand(self):
+        state, depth = self.get_next_from_frontier()
+        self._in_frontier.discard(state)
+        self.expand_count += 1
+        self.expand_state(state, depth)
+        return state
+
+
+    def log_path(self, from_state, action, to_state):
+        CfsSearcher.log_path(self, from_state, action, to_state)
+        self.owner.meet(to_state)
+
+
+    def cost_changed(self, state):
+        CfsSearcher.cost_changed(self, state)
+        self.owner.meet(state)
+
+
+    def bound(self):
+        if self._frontier:
+            return self._frontier.peek()
+        return float('inf')
+
+
+
+class BidirectionalSearcher(Searcher):
+    journaled = False
+
+
+    def __init__(self, problem, depth_limit=None):
+        self.problem = problem
+        self.depth_limit = depth_limit
+        self.goal_reached = None
+        self.expand_count = 0
+        self.frontier_peak = 1
+        self.meeting = None
+        self.path = None
+
+        self.forward = SearchFront(problem, self)
+        self.backward = SearchFront(ReversedProblem(problem), self)
+        self.meet(problem.get_initial())
+
+
+    def meet(self, state):
+        if state in self.forward.g and state in self.backward.g:
+            cost = self.forward.g[state] + self.backward.g[state]
+            if self.meeting is None or cost < self.meeting[0]:
+                self.meeting = cost, state
+
+
+    def is_visited(self, state):
+        return self.forward.is_visited(state) or self.backward.is_visited(state)
+
+
+    def get_visited(self):
+        return list(self.forward.get_visited()) + [
+            s for s in self.backward.get_visited() if not self.forward.is_visited(s) ]
+
+
+    def get_explored(self):
+        return self.forward.get_explored() + [
+            s for s in self.backward.get_explored() if not self.forward.is_explored(s) ]
+
+
+    def get_frontier(self):
+        return self.forward.get_frontier() + self.backward.get_frontier()
+
+
+    def frontier_size(self):
+        return len(self.forward._frontier) + len(self.backward._frontier)
+
+
+    def path_cost(self, to_state):
+        if to_state == self.goal_reached:
+            return self.meeting[0]
+        return self.forward.path_cost(to_state)
+
+
+    def expand(self):
+        if self.forward.bound() <= self.backward.bound():
+            state = self.forward.expand()
+        else:
+            state = self.backward.expand()
+        self.expand_count += 1
+        self.frontier_peak = max(self.frontier_peak, self.frontier_size())
+
+        if self.meeting is not None and self.forward.bound() + self.backward.bound() >= self.meeting[0]:
+            self.path = self.join(self.meeting[1])
+            self.goal_reached = self.problem.get_goal()
+
+        return state
+
+
+    def join(self, state):
+        path = list(zip(self.forward.trace_states(state), self.forward.trace_actions(state)))
+        next_state = self.backward.path_to[state][0]
+        while next_state is not None:
+            action = min(
+                (a for a in self.problem.actions(state) if self.problem.result(a) == next_state),
+                key=self.problem.cost)
+            path.append((next_state, action))
+            state, next_state = next_state, self.backward.path_to[next_state][0]
+        return path
+
+
+    def search(self):
+        while self.goal_reached is None:
+            if self.meeting is None and not (self.forward._frontier and self.backward._frontier):
+                return
+            self.expand()
+        return self.goal_reached
+
+
+    def trace_states(self, state=None):
+        if state is None and self.path is not None:
+            return [ s for s, a in self.path ]
+        return self.forward.trace_states(state)
+
+
+    def trace_actions(self, state=None):
+        if state is None and self.path is not None:
+            return [ a for s, a in self.path ]
+        return self.forward.trace_actions(state)
+
+
+
+class ChSearcher(Searcher):
+    journaled = False
+
+
+    def __init__(self, problem, depth_limit=None, hierarchy=None):
+        from aiclass.routing import ContractionHierarchy, graph_digest
+        self.problem = problem
+        self.depth_limit = depth_limit
+        self.goal_reached = None
+        self.expand_count = 0
+        self.frontier_peak = 1
+
+        # a hierarchy built from another map would route through the
+        # wrong graph, so a file whose digest differs is rebuilt
+        states = list(problem.all_states())
+        self.hierarchy = None
+        if hierarchy is not None and os.path.exists(hierarchy):
+            self.hierarchy = ContractionHierarchy.load(hierarchy)
+            if getattr(self.hierarchy, 'digest', None) != graph_digest(problem, states):
+                self.hierarchy = None
+        if self.hierarchy is None:
+            self.hierarchy = ContractionHierarchy(problem, states)
+            if hierarchy is not None:
+                self.hierarchy.save(hierarchy)
+
+        self.query = self.hierarchy.query(problem.get_initial(), problem.get_goal())
+        self.path_to = {problem.get_initial(): (None, None)}
+        self.g = {problem.get_initial(): 0}
+
+
+    def is_visited(self, state):
+        return self.hierarchy.ids.get(state) in self.query.parent[0]
+
+
+    def get_visited(self):
+        return [ self.hierarchy.states[s] for s in self.query.parent[0] ]
+
+
+    def get_explored(self):
+        return [ self.hierarchy.states[s] for s in self.query.settled ]
+
+
+    def get_frontier(self):
+        return [ self.hierarchy.states[s] for d, s in sorted(self.query.heaps[0] + self.query.heaps[1])
+                 if s not in self.query.settled ]
+
+
+    def frontier_size(self):
+        return len(self.query.heaps[0]) + len(self.query.heaps[1])
+
+
+    def expand(self):
+        state = self.query.step()
+        self.expand_count += 1
+        self.frontier_peak = max(self.frontier_peak, self.frontier_size())
+        self.finish()
+        return state
+
+
+    def finish(self):
+        if self.goal_reached is None and self.query.done() and self.query.meeting is not None:
+            path = self.hierarchy.unpack(self.query.path())
+            for (from_state, _), (to_state, action) in zip(path, path[1:]):
+                self.path_to[to_state] = from_state, action
+                self.g[to_state] = self.g[from_state] + self.problem.cost(action)
+            self.goal_reached = self.problem.get_goal()
+
+
+    def search(self):
+        self.finish()
+        while self.goal_reached is None:
+            if self.query.done():
+                return
+            self.expand()
+        return self.goal_reached
 
 
 
@@ -164,27 +815,77 @@ class MapRoutingProblem(Problem):
     goal = None
     paths = None
     heuristics = None
-
-    def __init__(self):
-        self.edges = self.parse_path(self.paths)
-        if self.heuristics:
+    compact = False
+    landmark_count = 8
+
+    def __init__(self, paths=None, heuristics=None, initial=None, goal=None, compact=None):
+        self.heuristics_goal = self.goal
+        self.landmarks = None
+
+        if paths is not None:
+            self.paths = paths
+        if initial is not None:
+            self.initial = initial
+        if goal is not None:
+            self.goal = goal
+        if heuristics is not None:
+            self.heuristics = heuristics
+            self.heuristics_goal = self.goal
+        if compact is not None:
+            self.compact = compact
+
+        if isinstance(self.paths, CompactGraph):
+            self.compact = True
+            self.graph = self.paths
+        elif self.compact:
+            self.graph = self.parse_path(self.paths, compact=True)
+        else:
+            self.graph = None
+            self.edges = self.parse_path(self.paths)
+            self.adjacency = self.build_adjacency(self.edges)
+
+        if self.compact:
+            self.adjacency = self.graph
+            self.initial = self.graph.ids.get(self.initial)
+            self.goal = self.graph.ids.get(self.goal)
+            self.heuristics_goal = self.graph.ids.get(self.heuristics_goal)
+
+        if isinstance(self.heuristics, HeuristicTable):
+            self.h = self.heuristics
+        elif self.heuristics:
             self.h = self.parse_heuristic(self.heuristics)
+            if self.graph is not None:
+                self.h = HeuristicTable.from_dict(self.graph, self.h)
 
 
-    def parse_path(self, data):
-        edges = []
-        for line in data.splitlines():
+    def build_adjacency(self, edges):
+        forward, backward = {}, {}
+        for a, b, c in edges:
+            forward.setdefault(a, []).append((b, c))
+            backward.setdefault(b, []).append((a, c))
+        for state, actions in backward.items():
+            forward.setdefault(state, []).extend(actions)
+        return forward
+
+
+    def iter_path(self, data):
+        for line in iter_lines(data):
             line = line.strip()
             if line != '':
                 ab, c = line.split(':', 1)
                 a, b = ab.split('->', 1)
-                edges.append((a.strip(),b.strip(),int(c.strip())))
-        return edges
+                yield a.strip(), b.strip(), int(c.strip())
+
+
+    def parse_path(self, data, compact=False):
+        if compact:
+            return CompactGraph.from_edges(self.iter_path(data), directed=False)
+        return list(self.iter_path(data))
 
 
     def parse_heuristic(self, data):
         h = {}
-        for line in data.splitlines():
+        for line in iter_lines(data):
             line = line.strip()
             if line != '':
                 a, b = line.split(':', 1)
@@ -193,7 +894,7 @@ class MapRoutingProblem(Problem):
 
 
     def actions(self, state):
-        return [ (b,c) for a,b,c in self.edges if a == state ] + [ (a,c) for a,b,c in self.edges if b == state ]
+        return self.adjacency.get(state, [])
 
 
     def result(self, action):
@@ -213,7 +914,49 @@ class MapRoutingProblem(Problem):
 
 
     def heuristic(self, state):
-        return self.h[state]
+        return self.estimate(state, self.goal)
+
+
+    def estimate(self, state, goal):
+        if self.heuristics and goal == self.heuristics_goal:
+            return self.h[state]
+        return self.get_landmarks().estimate(state, goal)
+
+
+    def get_landmarks(self):
+        if self.landmarks is None:
+            from aiclass.routing import Landmarks
+            start = self.initial
+            if start is None and len(self.adjacency):
+                start = 0 if self.compact else next(iter(self.adjacency))
+            self.landmarks = Landmarks(self, self.landmark_count, symmetric=True, start=start)
+        return self.landmarks
+
+
+    def get_goal(self):
+        return self.goal
+
+
+    def reverse_actions(self, state):
+        return self.actions(state)
+
+
+    def get_name(self, state):
+        if self.graph is None:
+            return state
+        return self.graph.names[state]
+
+
+    def all_states(self):
+        if self.graph is None:
+            return list(self.adjacency)
+        return range(len(self.graph))
+
+
+    def get_state(self, name):
+        if self.graph is None:
+            return name
+        return self.graph.ids.get(name)
 
 
 
@@ -221,14 +964,41 @@ class NodeCountProblem(Problem):
     initial = None
     goal = None
     paths = None
+    compact = False
+
+
+    def __init__(self, paths=None, initial=None, goal=None, compact=None):
+        if paths is not None:
+            self.paths = paths
+        if initial is not None:
+            self.initial = initial
+        if goal is not None:
+            self.goal = goal
+        if compact is not None:
+            self.compact = compact
+
+        if self.compact:
+            self.graph = parse_graph(self.paths, compact=True)
+            self.adjacency = self.graph
+            self.reverse_adjacency = self.graph.transpose()
+            self.initial = self.graph.ids.get(self.initial)
+            self.goal = self.graph.ids.get(self.goal)
+        else:
+            self.graph = None
+            self.edges = parse_graph(self.paths)
+            self.adjacency = {}
+            self.reverse_adjacency = {}
+            for a, b in self.edges:
+                self.adjacency.setdefault(a, []).append(b)
+                self.reverse_adjacency.setdefault(b, []).append(a)
 
 
-    def __init__(self):
-        self.edges = parse_graph(self.paths)
+    def actions(self, state):
+        return self.adjacency.get(state, [])
 
 
-    def actions(self, state):
-        return [ b for a,b in self.edges if a == state ]
+    def reverse_actions(self, state):
+        return self.reverse_adjacency.get(state, [])
 
 
     def result(self, action):
@@ -247,6 +1017,34 @@ class NodeCountProblem(Problem):
         return state == self.goal
 
 
+    def get_goal(self):
+        return self.goal
+
+
+    def get_name(self, state):
+        if self.graph is None:
+            return state
+        return self.graph.names[state]
+
+
+    def get_state(self, name):
+        if self.graph is None:
+            return name
+        return self.graph.ids.get(name)
+
+
+
+
+def constructor_arguments(cls):
+    # the keyword arguments a problem class takes, None for any at all
+    if cls.__init__ is object.__init__:
+        return set()
+    getargspec = getattr(inspect, 'getfullargspec', None) or inspect.getargspec
+    spec = getargspec(cls.__init__)
+    if spec[2] is not None:
+        return None
+    return set(spec[0][1:]) | set(getattr(spec, 'kwonlyargs', ()))
+
 
 
 class SearchCommand(BaseCommand):
@@ -258,6 +1056,14 @@ class SearchCommand(BaseCommand):
     Zerind
     >>> expand
     Timisoara
+    >>> explored
+    Arad
+    Zerind
+    Timisoara
+    >>> frontier
+    Sibiu
+    Oradea
+    Lugoj
     >>> expand
     Sibiu
     >>> expand
@@ -309,6 +1115,177 @@ class SearchCommand(BaseCommand):
     Pitesti
     Bucharest
 
+    $ aiclass search cfs data:ROMANIA
+    >>> route Arad -> Bucharest
+    Arad -> Sibiu -> Rimnicu Vilcea -> Pitesti -> Bucharest: 418
+    >>> route Arad -> Eforie
+    Arad -> Sibiu -> Rimnicu Vilcea -> Pitesti -> Bucharest -> Urziceni -> Hirsova -> Eforie: 687
+    >>> route Lugoj -> Arad
+    Lugoj -> Timisoara -> Arad: 229
+    >>> route Arad -> Nowhere
+    Arad -> Nowhere: FAILED
+
+    $ aiclass search cfs data:ROMANIA
+    >>> expand
+    Arad
+    >>> expand
+    Zerind
+    >>> save romania.ckpt
+    ok
+    >>> expand
+    Timisoara
+    >>> load romania.ckpt
+    ok
+    >>> count
+    2
+    >>> go
+    Arad
+    Sibiu
+    Rimnicu Vilcea
+    Pitesti
+    Bucharest
+
+    $ aiclass search cfs --checkpoint romania.ckpt data:ROMANIA
+    >>> count
+    2
+    >>> frontier
+    Timisoara
+    Sibiu
+    Oradea
+
+    $ aiclass search bfs data:ROMANIA
+    >>> expand
+    Arad
+    >>> load romania.ckpt
+    romania.ckpt is a checkpoint with searcher CfsSearcher, not BfsSearcher
+    >>> count
+    1
+
+    $ aiclass search cfs data:search-tree-ltr
+    >>> load romania.ckpt
+    romania.ckpt is a checkpoint with problem ROMANIA_PROBLEM, not SEARCH_TREE_LTR_PROBLEM
+
+    $ aiclass search -c astar data:ROMANIA
+    >>> expand
+    Arad
+    >>> go
+    Arad
+    Sibiu
+    Rimnicu Vilcea
+    Pitesti
+    Bucharest
+    >>> route Lugoj -> Arad
+    Lugoj -> Timisoara -> Arad: 229
+
+    $ aiclass search astar --stats data:ROMANIA
+    >>> search
+    ok
+    >>> stats calls
+    expanded 6
+    frontier peak 6
+    reopened 1
+    actions 5 calls
+    bookkeeping 10 calls
+    cost 16 calls
+    expand 6 calls
+    frontier 15 calls
+    goal_test 6 calls
+    heuristic 10 calls
+    priority 10 calls
+    result 15 calls
+
+    $ aiclass search -c dfs data:search-network-ltr
+    >>> search
+    ok
+    >>> count
+    16
+
+    $ aiclass search astar --start Lugoj --goal Eforie data:ROMANIA
+    >>> go
+    Lugoj
+    Mehadia
+    Drobeta
+    Craiova
+    Pitesti
+    Bucharest
+    Urziceni
+    Hirsova
+    Eforie
+    >>> count
+    9
+
+    $ aiclass search cfs --start Lugoj --goal Eforie data:ROMANIA
+    >>> search
+    ok
+    >>> count
+    17
+
+    $ aiclass search ida data:ROMANIA
+    >>> go
+    Arad
+    Sibiu
+    Rimnicu Vilcea
+    Pitesti
+    Bucharest
+    >>> count
+    21
+    >>> peak
+    3
+
+    $ aiclass search beam -w 2 data:ROMANIA
+    >>> go
+    Arad
+    Sibiu
+    Rimnicu Vilcea
+    Pitesti
+    Bucharest
+    >>> count
+    6
+    >>> peak
+    2
+
+    $ aiclass search bidirectional data:ROMANIA
+    >>> expand
+    Arad
+    >>> expand
+    Bucharest
+    >>> expand
+    Zerind
+    >>> search
+    ok
+    >>> go
+    Arad
+    Sibiu
+    Rimnicu Vilcea
+    Pitesti
+    Bucharest
+    >>> count
+    9
+
+    $ aiclass search bidirectional data:search-network-ltr
+    >>> search
+    ok
+    >>> count
+    6
+
+    $ aiclass search ch data:ROMANIA
+    >>> go
+    Arad
+    Sibiu
+    Rimnicu Vilcea
+    Pitesti
+    Bucharest
+    >>> count
+    8
+    >>> route Arad -> Eforie
+    Arad -> Sibiu -> Rimnicu Vilcea -> Pitesti -> Bucharest -> Urziceni -> Hirsova -> Eforie: 687
+    >>> route Lugoj -> Arad
+    Lugoj -> Timisoara -> Arad: 229
+
+    $ aiclass search ch --start Arad --goal Arad data:ROMANIA
+    >>> go
+    Arad
+
     $ aiclass search bfs data:search-tree-ltr
     >>> search
     ok
@@ -401,8 +1378,23 @@ class SearchCommand(BaseCommand):
     def configure_parser(cls, parser):
         parser.add_argument(
             'type',
-            choices=['astar', 'bfs', 'cfs', 'dfs'],
+            choices=['astar', 'beam', 'bfs', 'bidirectional', 'cfs', 'ch', 'dfs', 'ida'],
             help='type of searcher')
+        parser.add_argument('-w', '--width', type=int, help='node budget of the beam searcher')
+        parser.add_argument('-b', '--batch', help='file of "start -> goal" queries, - for stdin')
+        parser.add_argument('-j', '--jobs', default=1, type=int, help='worker processes for batch queries')
+        parser.add_argument('--hierarchy', help='file of the contraction hierarchy, built when missing or stale')
+        parser.add_argument('-c', '--compact', action='store_true', help='load the graph into integer arrays')
+        parser.add_argument('--start', help='initial state of the problem')
+        parser.add_argument('--goal', help='goal state of the problem')
+        parser.add_argument('--heuristics', help='heuristic table of a map file')
+        parser.add_argument('--mmap', action='store_true', help='read map files through mmap')
+        parser.add_argument('--progress', action='store_true', help='report loading progress')
+        parser.add_argument('--cache', help='directory of binary caches of map files')
+        parser.add_argument('--stats', action='store_true', help='time the phases of the search')
+        parser.add_argument('--checkpoint', help='journal file of the search, resumed when it exists')
+        parser.add_argument('--every', type=int, help='expansions between checkpoints')
+        parser.add_argument('--every-seconds', type=float, help='seconds between checkpoints')
         parser.add_argument('problem', help='problem to search')
 
 
@@ -411,20 +1403,155 @@ class SearchCommand(BaseCommand):
         from aiclass import search
         SearcherClass = globals().get(args.type.capitalize() + 'Searcher')
 
+        settings = dict(
+            batch = args.batch,
+            jobs = args.jobs,
+            stats = args.stats,
+            checkpoint = args.checkpoint,
+            every = args.every,
+            seconds = args.every_seconds)
+
+        options = {}
+        if args.width is not None:
+            options['width'] = args.width
+        if args.hierarchy is not None:
+            options['hierarchy'] = args.hierarchy
+
         if args.problem.startswith('data:'):
             from aiclass import data
             ProblemClass = getattr(data, args.problem[5:].upper().replace('-', '_')+'_PROBLEM')
+        elif os.path.isfile(args.problem):
+            ProblemClass = None
         else:
             problem_name = args.problem.split('.')
             mod_name, class_name = '.'.join(problem_name[:-1]), problem_name[-1]
             ProblemClass = getattr(__import__(mod_name, fromlist=[class_name]), class_name)
 
-        problem = ProblemClass()
-        return cls(problem, SearcherClass)
+        if ProblemClass is None:
+            problem = cls.load_map(args)
+        else:
+            kwargs, accepted = {}, constructor_arguments(ProblemClass)
+            for option, name, value in [
+                    ('--compact', 'compact', args.compact or None),
+                    ('--start', 'initial', args.start),
+                    ('--goal', 'goal', args.goal)]:
+                if value is None:
+                    continue
+                if accepted is not None and name not in accepted:
+                    raise SystemExit('aiclass search: error: %s is not supported by %s' % (
+                        option, ProblemClass.__name__))
+                kwargs[name] = value
+            problem = ProblemClass(**kwargs)
+
+        from aiclass.checkpoint import CheckpointError
+        try:
+            return cls(problem, SearcherClass, settings, **options)
+        except CheckpointError as e:
+            raise SystemExit('aiclass search: error: %s' % e)
+
+
+    @classmethod
+    def load_map(cls, args):
+        from aiclass.graph import file_digest, load_graph, save_graph
+
+        if args.cache:
+            cache = os.path.join(args.cache, file_digest(args.problem, args.heuristics) + '.graph')
+            if os.path.exists(cache):
+                graph, h = load_graph(cache)
+                return MapRoutingProblem(paths=graph, heuristics=h, initial=args.start, goal=args.goal)
+
+        problem = MapRoutingProblem(
+            paths = cls.open_data(args.problem, args.mmap, args.progress),
+            heuristics = args.heuristics and cls.open_data(args.heuristics, args.mmap, args.progress),
+            initial = args.start,
+            goal = args.goal,
+            compact = args.compact or bool(args.cache))
+
+        if args.cache:
+            if not os.path.isdir(args.cache):
+                os.makedirs(args.cache)
+            save_graph(cache, problem.graph, problem.h if args.heuristics else None)
+        return problem
+
+
+    def __init__(self, problem, searcher_class, settings=None, **options):
+        settings = settings or {}
+        self.problem = problem
+        self.searcher_class = searcher_class
+        self.options = options
+        self.batch = settings.get('batch')
+        self.jobs = settings.get('jobs', 1)
+        self.every = settings.get('every')
+        self.seconds = settings.get('seconds')
+        self.router = None
+        self.create_searcher(settings.get('checkpoint'), settings.get('stats', False))
+
+
+    def create_searcher(self, checkpoint=None, stats=False):
+        # the session only changes once the checkpoint has loaded, so a
+        # file that is refused leaves the current search as it was
+        from aiclass.checkpoint import Journal
+        searcher = self.searcher_class(self.problem, **self.options)
+
+        journal = None
+        if searcher.journaled and checkpoint is not None:
+            if os.path.exists(checkpoint):
+                journal = Journal.load(searcher, checkpoint, every=self.every, seconds=self.seconds)
+            else:
+                journal = Journal(searcher, checkpoint, every=self.every, seconds=self.seconds)
+
+        searcher_stats = None
+        if stats:
+            from aiclass.stats import SearchStats
+            searcher_stats = SearchStats()
+            searcher_stats.attach(searcher)
+        self.searcher, self.journal, self.stats = searcher, journal, searcher_stats
+
+
+    def get_router(self):
+        from aiclass.routing import Router
+        if self.router is None and isinstance(self.searcher, ChSearcher):
+            self.router = self.searcher.hierarchy
+        elif self.router is None:
+            self.router = Router(self.problem)
+        return self.router
+
+
+    def get_names(self, states):
+        return [ self.problem.get_name(s) for s in states ]
 
 
-    def __init__(self, problem, searcher_class):
-        self.searcher = searcher_class(problem)
+    def get_states(self, queries):
+        for initial, goal in queries:
+            yield self.problem.get_state(initial), self.problem.get_state(goal)
+
+
+    def format_route(self, initial, goal, route):
+        if route is None:
+            return '%s -> %s: FAILED' % (initial, goal)
+        cost, states = route
+        return '%s: %s' % (' -> '.join(self.get_names(states)), cost)
+
+
+    def loop(self):
+        if self.batch is None:
+            return BaseCommand.loop(self)
+
+        from aiclass.routing import parse_queries, parallel_routes
+        f = sys.stdin if self.batch == '-' else open(self.batch, 'r')
+        try:
+            queries, names = itertools.tee(parse_queries(f))
+            if self.jobs > 1:
+                router = self.get_router() if isinstance(self.searcher, ChSearcher) else None
+                routes = parallel_routes(self.problem, self.get_states(queries), self.jobs, router=router)
+            else:
+                routes = self.get_router().routes(self.get_states(queries))
+            for (initial, goal), (_, _, route) in zip(names, routes):
+                print(self.format_route(initial, goal, route))
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        raise SystemExit
 
 
     def call(self, string):
@@ -432,25 +1559,58 @@ class SearchCommand(BaseCommand):
             raise SystemExit
         elif string == 'count':
             return self.searcher.expand_count
+        elif string == 'peak':
+            return self.searcher.frontier_peak
         elif string == 'expand':
-            return self.searcher.expand()
+            state = self.searcher.expand()
+            return None if state is None else self.problem.get_name(state)
         elif string == 'explored':
-            return '\n'.join(e for e in self.searcher.get_explored())
+            return '\n'.join(self.get_names(self.searcher.get_explored()))
         elif string == 'frontier':
-            return '\n'.join(f[0] for f in self.searcher._frontier)
+            return '\n'.join(self.get_names(self.searcher.get_frontier()))
         elif string == 'go':
-            if self.searcher.search():
-                return '\n'.join(s for s in self.searcher.trace_states())
+            if self.searcher.search() is not None:
+                return '\n'.join(self.get_names(self.searcher.trace_states()))
         elif string == 'search':
-            if self.searcher.search():
+            if self.searcher.search() is not None:
                 return 'ok'
             else:
                 return 'FAILED'
+        elif string.startswith('route '):
+            initial, goal = [ s.strip() for s in string[6:].split('->', 1) ]
+            route = self.get_router().route(self.problem.get_state(initial), self.problem.get_state(goal))
+            return self.format_route(initial, goal, route)
         elif string.startswith('trace '):
-            state = string[6:].strip()
-            return '\n'.join(s for s in self.searcher.trace_states(state))
+            state = self.problem.get_state(string[6:].strip())
+            return '\n'.join(self.get_names(self.searcher.trace_states(state)))
+        elif string.startswith('save ') or string.startswith('load '):
+            if not self.searcher.journaled:
+                return 'checkpoints are not supported by %s' % type(self.searcher).__name__
+            filename = string[5:].strip()
+            if string.startswith('save '):
+                if self.journal is None:
+                    from aiclass.checkpoint import Journal
+                    self.journal = Journal(self.searcher, every=self.every, seconds=self.seconds)
+                self.journal.save(filename)
+            elif os.path.exists(filename):
+                from aiclass.checkpoint import CheckpointError
+                try:
+                    self.create_searcher(filename, self.stats is not None)
+                except CheckpointError as e:
+                    return str(e)
+            else:
+                return 'no checkpoint %s' % filename
+            return 'ok'
+        elif string in ('stats', 'stats json', 'stats calls'):
+            if self.stats is None:
+                return 'run with --stats to collect statistics'
+            elif string == 'stats json':
+                return self.stats.dumps()
+            elif string == 'stats calls':
+                return self.stats.format_calls()
+            return self.stats.format()
         else:
-            return 'count\texpand\texplored\tfrontier\tgo\tquit\ttrace'
+            return 'count\texpand\texplored\tfrontier\tgo\tload\tpeak\tquit\troute\tsave\tstats\ttrace'
 
 
 
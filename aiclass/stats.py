@@ -0,0 +1,116 @@
+import json, timeit
+
+
+class SearchStats(object):
+    problem_phases = ['actions', 'result', 'cost', 'goal_test', 'heuristic']
+    searcher_phases = [
+        ('get_next_from_frontier', 'frontier'),
+        ('add_to_frontier', 'frontier'),
+        ('log_path', 'bookkeeping') ]
+
+
+    def __init__(self, timer=timeit.default_timer):
+        self.timer = timer
+        self.seconds = {}
+        self.calls = {}
+        self.stack = []
+        self.elapsed = 0.0
+        self.reopened = 0
+        self.samples = 0
+        self.frontier_total = 0
+
+
+    def attach(self, searcher):
+        self.searcher = searcher
+        for name in self.problem_phases:
+            if hasattr(searcher.problem, name):
+                setattr(searcher.problem, name, self.timed(name, getattr(searcher.problem, name)))
+        for name, phase in self.searcher_phases:
+            if hasattr(searcher, name):
+                setattr(searcher, name, self.timed(phase, getattr(searcher, name)))
+
+        # priority queues hold on to the method they were created with
+        frontier = getattr(searcher, '_frontier', None)
+        if hasattr(frontier, 'priority'):
+            frontier.priority = self.timed('priority', frontier.priority)
+
+        log_path = getattr(searcher, 'log_path', None)
+        if log_path is not None:
+            def counted_log_path(from_state, action, to_state):
+                if to_state in searcher.path_to:
+                    self.reopened += 1
+                return log_path(from_state, action, to_state)
+            searcher.log_path = counted_log_path
+
+        expand = self.timed('expand', searcher.expand)
+        def sampled_expand():
+            state = expand()
+            self.samples += 1
+            self.frontier_total += searcher.frontier_size()
+            return state
+        searcher.expand = sampled_expand
+        return searcher
+
+
+    def timed(self, phase, function):
+        seconds, calls, stack, timer = self.seconds, self.calls, self.stack, self.timer
+        seconds.setdefault(phase, 0.0)
+        calls.setdefault(phase, 0)
+
+        def wrapper(*args, **kwargs):
+            stack.append(0.0)
+            start = timer()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = timer() - start
+                seconds[phase] += elapsed - stack.pop()
+                calls[phase] += 1
+                if stack:
+                    stack[-1] += elapsed
+                else:
+                    self.elapsed += elapsed
+        return wrapper
+
+
+    def report(self):
+        expanded = self.searcher.expand_count
+        return {
+            'expanded': expanded,
+            'elapsed': self.elapsed,
+            'nodes_per_second': expanded / self.elapsed if self.elapsed else 0.0,
+            'frontier_peak': self.searcher.frontier_peak,
+            'frontier_average': float(self.frontier_total) / self.samples if self.samples else 0.0,
+            'reopened': self.reopened,
+            'phases': dict(
+                (phase, {'calls': self.calls[phase], 'seconds': self.seconds[phase]})
+                for phase in self.calls if self.calls[phase]) }
+
+
+    def dumps(self):
+        return json.dumps(self.report(), sort_keys=True)
+
+
+    def format(self):
+        report = self.report()
+        lines = [
+            'expanded\t%d' % report['expanded'],
+            'elapsed\t%.6f' % report['elapsed'],
+            'nodes/s\t%.1f' % report['nodes_per_second'],
+            'frontier peak\t%d' % report['frontier_peak'],
+            'frontier average\t%.1f' % report['frontier_average'],
+            'reopened\t%d' % report['reopened'] ]
+        for phase, entry in sorted(report['phases'].items(), key=lambda p: -p[1]['seconds']):
+            lines.append('%s\t%.6f\t%d calls' % (phase, entry['seconds'], entry['calls']))
+        return '\n'.join(lines)
+
+
+    def format_calls(self):
+        report = self.report()
+        lines = [
+            'expanded %d' % report['expanded'],
+            'frontier peak %d' % report['frontier_peak'],
+            'reopened %d' % report['reopened'] ]
+        for phase, entry in sorted(report['phases'].items()):
+            lines.append('%s %d calls' % (phase, entry['calls']))
+        return '\n'.join(lines)
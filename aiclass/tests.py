@@ -1,6 +1,6 @@
 from __future__ import print_function
 
-import inspect, os.path, re, shlex, sys, traceback, unittest
+import atexit, inspect, os.path, re, shlex, shutil, sys, tempfile, traceback, unittest
 
 try:
     import StringIO
@@ -51,6 +51,20 @@ Exception Raised:
 
 
 
+_scratch = None
+
+
+def scratch_directory():
+    # transcripts that save files write them here, shared by the
+    # sessions of a run so that a later one can load an earlier file
+    global _scratch
+    if _scratch is None:
+        _scratch = tempfile.mkdtemp(prefix='aiclass-')
+        atexit.register(shutil.rmtree, _scratch, True)
+    return _scratch
+
+
+
 class TestCase(unittest.TestCase):
 
     def __init__(self, filename, lineno, arguments, examples):
@@ -66,6 +80,15 @@ class TestCase(unittest.TestCase):
         return 'aiclass ' + self.arguments
 
 
+    def setUp(self):
+        self.cwd = os.getcwd()
+        os.chdir(scratch_directory())
+
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+
     def runTest(self):
         tries = 0
         failures = 0